@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""Benchmark for the JSON decoder backends and compressed transfer.
+
+Measures the decoding throughput of the installed decoder backends (json and,
+if installed, simplejson and ujson) on Fitness Activity detail and feed
+payloads, then retrieves the feed and a number of activity details from the
+local mock server with and without compression, reporting the bytes on the
+wire, the decoded body size and the decoding time from the client metrics.
+
+Running the benchmark: python bench_decode.py --details 50 --latency 0.01
+
+"""
+
+import os
+import sys
+import time
+import json
+import optparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import healthgraph
+from mockserver import MockAPIServer, MockData
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+def bench_decoders(path_points, repeat):
+    data = MockData(num_items=100, path_points=path_points)
+    payloads = (('activity', [json.dumps(data.fitness_activity(idx))
+                              for idx in range(20)]),
+                ('feed_page', [json.dumps(data.feed_page(
+                                    '/fitnessActivities', page, 25, {}))
+                               for page in range(4)]),)
+    print "%-12s %-10s %10s %10s" % ('decoder', 'payload', 'MB/s', 'ms/doc')
+    for name in healthgraph.available_decoders():
+        decoder = healthgraph.get_decoder(name)
+        for payload_name, docs in payloads:
+            size = sum(len(doc) for doc in docs)
+            best = None
+            for _ in range(repeat):
+                start = time.time()
+                for doc in docs:
+                    decoder(doc)
+                elapsed = time.time() - start
+                best = min(best or elapsed, elapsed)
+            print "%-12s %-10s %10.1f %10.3f" % (name, payload_name,
+                                                 size / best / 1e6,
+                                                 best * 1000 / len(docs))
+
+
+def fetch(details, compress):
+    metrics = healthgraph.get_metrics()
+    metrics.reset()
+    session = healthgraph.Session('token', compress=compress)
+    user = healthgraph.User(session=session)
+    start = time.time()
+    items = list(user.get_fitness_activity_iter())
+    for item in items[:details]:
+        item.get_activity_detail()
+    elapsed = time.time() - start
+    snapshot = metrics.snapshot()
+    return elapsed, snapshot
+
+
+def bench_transfer(details):
+    print
+    print "%-12s %-30s %8s %12s %12s %7s %10s" % (
+        'compress', 'content type', 'requests', 'wire bytes', 'body bytes',
+        'ratio', 'decode ms')
+    for compress in (False, True):
+        elapsed, snapshot = fetch(details, compress)
+        for content_type, stats in sorted(snapshot['requests'].items()):
+            decode = snapshot['decode'].get(content_type)
+            print "%-12s %-30s %8d %12d %12d %6.1f%% %10.1f" % (
+                compress, content_type, stats['count'], stats['bytes_wire'],
+                stats['bytes_received'],
+                stats['bytes_wire'] * 100.0 / max(1, stats['bytes_received']),
+                decode['sum'] * 1000 if decode else 0)
+        print "%-12s %-30s %.3f s" % (compress, 'total time', elapsed)
+
+
+def main(argv=None):
+    parser = optparse.OptionParser()
+    parser.add_option('-p', '--pages', dest='pages', type='int', default=4)
+    parser.add_option('-d', '--details', dest='details', type='int',
+                      default=50, help='Activity details retrieved.')
+    parser.add_option('-l', '--latency', dest='latency', type='float',
+                      default=0.0, help='Request latency in seconds.')
+    parser.add_option('--path-points', dest='path_points', type='int',
+                      default=600, help='Points in Fitness Activity streams.')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3)
+    opts = parser.parse_args(argv)[0]
+    bench_decoders(opts.path_points, opts.repeat)
+    server = MockAPIServer(latency=opts.latency,
+                           num_items=opts.pages * healthgraph.settings.DEFAULT_PAGE_SIZE,
+                           path_points=opts.path_points)
+    server.start()
+    healthgraph.settings.API_URL = server.url
+    try:
+        bench_transfer(opts.details)
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""Memory benchmark for feed items and Fitness Activity streams.
+
+Reports the bytes per item held by the standard and the compact feed item
+representations of Fitness Activity, Weight and Sleep feeds, and the bytes per
+point held by the list of dictionaries and the columnar representations of the
+streams (path, heart_rate, distance, calories) of Fitness Activities. Sizes are
+computed by walking the object graph of all items with sys.getsizeof; objects
+shared between items (such as interned strings) are counted once, and the
+session shared by all items is excluded.
+
+Running the benchmark: python bench_memory.py --items 5000 --path-points 3600
+
+"""
+
+import os
+import sys
+import gc
+import optparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import healthgraph
+from healthgraph.parser import get_resource_parser
+from healthgraph.resources import compact_item_class, FitnessActivity
+from mockserver import MockData
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+def deep_sizeof(objs, exclude=()):
+    """Return total size in bytes of objs and all objects reachable from them.
+
+    @param objs:    List of root objects.
+    @param exclude: Objects that are not traversed.
+
+    """
+    seen = set(id(obj) for obj in exclude)
+    stack = list(objs)
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            stack.extend(gc.get_referents(obj))
+    return total
+
+
+def run(name, item_cls, payloads, session):
+    items = [item_cls(data, session) for data in payloads]
+    standard = deep_sizeof(items, (session,)) / float(len(items))
+    compact_cls = compact_item_class(item_cls)
+    items = [compact_cls(data, session) for data in payloads]
+    compact = deep_sizeof(items, (session,)) / float(len(items))
+    print "%-28s %10.0f %10.0f %8.1fx" % (name, standard, compact,
+                                          standard / compact)
+
+
+def run_streams(data, num_points):
+    payload = data.fitness_activity(0)
+    standard = get_resource_parser(FitnessActivity._prop_defs)(payload)
+    columnar = get_resource_parser(FitnessActivity._columnar_prop_defs)(payload)
+    for name in ('path', 'heart_rate', 'distance', 'calories'):
+        assert list(standard[name]) == list(columnar[name])
+        before = deep_sizeof([standard[name]]) / float(num_points)
+        after = deep_sizeof([columnar[name]]) / float(num_points)
+        print "%-28s %10.1f %10.1f %8.1fx" % (name, before, after, 
+                                              before / after)
+
+
+def main(argv=None):
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--items', dest='items', type='int', default=5000)
+    parser.add_option('-p', '--path-points', dest='path_points', type='int',
+                      default=3600, help='Points in Fitness Activity streams.')
+    opts = parser.parse_args(argv)[0]
+    data = MockData(num_items=opts.items, path_points=opts.path_points)
+    session = healthgraph.Session('token')
+    print "%-28s %10s %10s %9s" % ('bytes/item', 'standard', 'compact', '')
+    for name, feed, item_cls in (
+            ('FitnessActivityFeedItem', 'fitness',
+             healthgraph.FitnessActivityFeedItem),
+            ('WeightMeasurementFeedItem', 'weight',
+             healthgraph.WeightMeasurementFeedItem),
+            ('SleepMeasurementFeedItem', 'sleep',
+             healthgraph.SleepMeasurementFeedItem),):
+        payloads = [data.feed_item(feed, idx) for idx in range(opts.items)]
+        run(name, item_cls, payloads, session)
+    print
+    print "%-28s %10s %10s %9s" % ('bytes/point', 'dicts', 'columnar', '')
+    run_streams(data, opts.path_points)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""Microbenchmarks for the parser functions with regression thresholds.
+
+Reports operations per second for parse_datetime, parse_date, parse_bool,
+parse_distance, parse_resource_dict (Fitness Activity feed items and details)
+and PersonalRecords._parse_data, using synthetic payloads generated by the
+mock server. Each benchmark is repeated and the best run is reported. With
+--legacy, the feed item and Fitness Activity benchmarks are also run with the
+interpreted parser of earlier versions (per key dispatch and uncompiled 
+regular expressions for dates) for comparison with the compiled parsers.
+
+Saving a baseline:    python bench_parser_micro.py --save parser_baseline.json
+Checking regressions: python bench_parser_micro.py --check parser_baseline.json
+Legacy comparison:    python bench_parser_micro.py --legacy
+
+In check mode the exit status is 1 if the throughput of any benchmark drops
+by more than --threshold percent below the baseline. Baselines are only
+comparable on the same machine and Python version.
+
+"""
+
+import os
+import re
+import sys
+import time
+import platform
+import optparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+from healthgraph import parser, settings
+from healthgraph.resources import (FitnessActivityFeedItem, FitnessActivity,
+                                   PersonalRecords)
+from mockserver import MockData
+from regression import compare, load_report, save_report
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+def legacy_parse_date(val):
+    if val is None:
+        return None
+    mobj = re.match('\w+,\s*(\d+)\s+(\w+)\s+(\d+)', val)
+    if mobj is not None:
+        return parser.date(int(mobj.group(3)),
+                           settings.MONTH2NUM[mobj.group(2)],
+                           int(mobj.group(1)))
+
+def legacy_parse_datetime(val):
+    if val is None:
+        return None
+    mobj = re.match('\w+,\s*(\d+)\s+(\w+)\s+(\d+)\s+(\d+):(\d+):(\d+)', val)
+    if mobj is not None:
+        return parser.datetime(int(mobj.group(3)),
+                               settings.MONTH2NUM[mobj.group(2)],
+                               int(mobj.group(1)),
+                               int(mobj.group(4)),
+                               int(mobj.group(5)),
+                               int(mobj.group(6)),)
+
+def legacy_parse_resource_dict(prop_defs, data):
+    prop_dict = dict([(k, None) for k in prop_defs])
+    for k,v in data.items():
+        if prop_defs.has_key(k):
+            action = prop_defs[k]
+            if action is None or v is None:
+                prop_dict[k] = v
+            elif callable(action):
+                prop_dict[k] = action(v)
+    return prop_dict
+
+def legacy_parser(prop_defs):
+    """Return the interpreted parser of earlier versions for prop_defs."""
+    replace = {parser.parse_date: legacy_parse_date,
+               parser.parse_datetime: legacy_parse_datetime,}
+    legacy_defs = dict((k, replace.get(v, v)) for k, v in prop_defs.items())
+    return lambda data: legacy_parse_resource_dict(legacy_defs, data)
+
+
+def build_benchmarks(path_points, legacy=False):
+    """Return list of (name, func, payloads) tuples."""
+    data = MockData(num_items=1000, path_points=path_points)
+    feed_items = [data.feed_item('fitness', idx) for idx in range(1000)]
+    activities = [data.fitness_activity(idx) for idx in range(20)]
+    datetimes = [item['start_time'] for item in feed_items]
+    dates = [' '.join(val.split()[:4]) for val in datetimes]
+    bools = ['true', 'false', 'True', 'False', None] * 200
+    distances = [item['total_distance'] for item in feed_items]
+    records = [data.records() for _ in range(10)]
+    records_parser = PersonalRecords.__new__(PersonalRecords)
+    benchmarks = [('parse_datetime', parser.parse_datetime, datetimes),
+            ('parse_date', parser.parse_date, dates),
+            ('parse_bool', parser.parse_bool, bools),
+            ('parse_distance', parser.parse_distance, distances),
+            ('parse_resource_dict[FitnessActivityFeedItem]',
+             lambda val: parser.parse_resource_dict(
+                                    FitnessActivityFeedItem._prop_defs, val),
+             feed_items),
+            ('parse_resource_dict[FitnessActivity]',
+             lambda val: parser.parse_resource_dict(
+                                    FitnessActivity._prop_defs, val),
+             activities),
+            ('PersonalRecords._parse_data', records_parser._parse_data,
+             records),]
+    if legacy:
+        for cls, payloads in ((FitnessActivityFeedItem, feed_items),
+                              (FitnessActivity, activities),):
+            func = legacy_parser(cls._prop_defs)
+            for data in payloads:
+                assert func(data) == parser.parse_resource_dict(
+                                                    cls._prop_defs, data)
+            benchmarks.append(('legacy_parse_resource_dict[%s]' % cls.__name__,
+                               func, payloads))
+    return benchmarks
+
+
+def measure(func, payloads, min_time, repeat):
+    """Return best ops/sec of repeat runs of at least min_time seconds."""
+    best = 0
+    for _ in range(repeat):
+        count = 0
+        start = time.time()
+        while True:
+            for val in payloads:
+                func(val)
+            count += len(payloads)
+            elapsed = time.time() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, count / elapsed)
+    return best
+
+
+def main(argv=None):
+    opt_parser = optparse.OptionParser()
+    opt_parser.add_option('-t', '--time', dest='min_time', type='float',
+                          default=0.5, help='Minimum time per run.')
+    opt_parser.add_option('-r', '--repeat', dest='repeat', type='int',
+                          default=3, help='Runs per benchmark.')
+    opt_parser.add_option('-p', '--path-points', dest='path_points', type='int',
+                          default=600, help='Points in Fitness Activity streams.')
+    opt_parser.add_option('-s', '--save', dest='save',
+                          help='Save results as baseline JSON file.')
+    opt_parser.add_option('-c', '--check', dest='check',
+                          help='Compare with baseline JSON file.')
+    opt_parser.add_option('--threshold', dest='threshold', type='float',
+                          default=15.0,
+                          help='Maximum throughput drop in percent.')
+    opt_parser.add_option('-l', '--legacy', dest='legacy', action='store_true',
+                          default=False,
+                          help='Also run the interpreted parser of earlier '
+                               'versions.')
+    opts = opt_parser.parse_args(argv)[0]
+    results = {}
+    print "%-52s %12s" % ('ops/sec', '')
+    for name, func, payloads in build_benchmarks(opts.path_points, 
+                                                 opts.legacy):
+        ops = measure(func, payloads, opts.min_time, opts.repeat)
+        results[name] = {'ops_per_sec': ops,}
+        print "%-52s %12.0f" % (name, ops)
+    if opts.save:
+        save_report(opts.save, {'python': platform.python_version(),
+                                'platform': platform.platform(),
+                                'path_points': opts.path_points,
+                                'results': results,})
+    if opts.check:
+        baseline = load_report(opts.check)
+        if baseline.get('path_points') != opts.path_points:
+            print "Warning: baseline uses %s path points." % (
+                baseline.get('path_points'),)
+        if compare(baseline['results'], results, opts.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""Peak memory benchmark for retrieving Fitness Activities with long streams.
+
+Retrieves a Fitness Activity with the given number of points in each stream
+from the local mock server, decoding the complete response with resp.json()
+into lists of dictionaries (standard) or ColumnarArray objects (columnar), and
+decoding the response incrementally into ColumnarArray objects (streaming).
+
+Each retrieval runs in a separate child process; the peak resident set size
+of the process (VmHWM on Linux, ru_maxrss elsewhere) is reported, together with
+its increase over the size measured right before the retrieval.
+
+Running the benchmark: python bench_streaming.py --path-points 100000
+
+"""
+
+import os
+import sys
+import time
+import resource
+import optparse
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import healthgraph
+from mockserver import MockAPIServer
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+MODES = {'standard': {},
+         'columnar': {'columnar': True},
+         'streaming': {'streaming': True},}
+
+ACTIVITY_RESOURCE = '/fitnessActivities/100000'
+
+
+def max_rss_kb():
+    # On Linux ru_maxrss is inherited from the parent process across exec;
+    # VmHWM is reset.
+    try:
+        with open('/proc/self/status') as fp:
+            for line in fp:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on Mac OS X.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss /= 1024
+    return rss
+
+
+def child(url, mode):
+    healthgraph.settings.API_URL = url
+    session = healthgraph.Session('token')
+    # Establish the connection before taking the baseline.
+    session.get_data('/user')
+    baseline = max_rss_kb()
+    start = time.time()
+    act = healthgraph.FitnessActivity(ACTIVITY_RESOURCE, session=session,
+                                      **MODES[mode])
+    elapsed = time.time() - start
+    peak = max_rss_kb()
+    print peak - baseline, peak, elapsed, len(act['path'])
+
+
+def run(url, mode):
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__),
+                             '--child', mode, '--url', url],
+                            stdout=subprocess.PIPE)
+    out = proc.communicate()[0]
+    if proc.returncode != 0:
+        raise RuntimeError("Benchmark process for %s failed." % mode)
+    increase, peak, elapsed, points = out.split()
+    print "%-10s %10d KB %10d KB %8.2f s %8s" % (mode, int(increase), int(peak),
+                                                  float(elapsed), points)
+
+
+def main(argv=None):
+    parser = optparse.OptionParser()
+    parser.add_option('-p', '--path-points', dest='path_points', type='int',
+                      default=100000, help='Points in Fitness Activity streams.')
+    parser.add_option('--child', dest='child', type='choice',
+                      choices=MODES.keys(), help=optparse.SUPPRESS_HELP)
+    parser.add_option('--url', dest='url', help=optparse.SUPPRESS_HELP)
+    opts = parser.parse_args(argv)[0]
+    if opts.child is not None:
+        child(opts.url, opts.child)
+        return 0
+    server = MockAPIServer(num_items=1, path_points=opts.path_points)
+    server.start()
+    try:
+        print "%-10s %13s %13s %10s %8s" % ('', 'increase', 'peak RSS',
+                                             'time', 'points')
+        for mode in ('standard', 'columnar', 'streaming'):
+            run(server.url, mode)
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""Benchmark for the pooled keep-alive transport of healthgraph.Session.
+
+Walks a complete Fitness Activity feed served by the local mock server,
+once opening a new connection for every request (the behavior of the client
+before the transport was pooled) and once through the shared connection pool.
+
+Running the benchmark: python bench_transport.py --pages 40
+
+"""
+
+import os
+import sys
+import time
+import optparse
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import healthgraph
+from mockserver import MockAPIServer
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+class UnpooledTransport(object):
+    """Transport opening a new connection for every request."""
+
+    def request(self, *args, **kwargs):
+        return requests.request(*args, **kwargs)
+
+
+def walk_feed(session):
+    user = healthgraph.User(session=session)
+    return sum(1 for _ in user.get_fitness_activity_iter())
+
+
+def run(server, name, transport, rounds):
+    server.reset_counters()
+    session = healthgraph.Session('token', transport=transport)
+    start = time.time()
+    for _ in range(rounds):
+        items = walk_feed(session)
+    elapsed = time.time() - start
+    print "%-10s %8.3f s %8.1f req/s %6d conn %6d req %8.1f ms/req" % (
+        name, elapsed, server.requests / elapsed, server.connections,
+        server.requests, elapsed * 1000 / server.requests)
+    return items
+
+
+def main(argv=None):
+    parser = optparse.OptionParser()
+    parser.add_option('-p', '--pages', dest='pages', type='int', default=40)
+    parser.add_option('-r', '--rounds', dest='rounds', type='int', default=3)
+    parser.add_option('-l', '--latency', dest='latency', type='float',
+                      default=0.005, help='Request latency in seconds.')
+    parser.add_option('-c', '--connect-latency', dest='connect_latency',
+                      type='float', default=0.03,
+                      help='Connection setup latency in seconds.')
+    opts = parser.parse_args(argv)[0]
+    server = MockAPIServer(latency=opts.latency,
+                           connect_latency=opts.connect_latency,
+                           num_items=opts.pages * healthgraph.settings.DEFAULT_PAGE_SIZE)
+    server.start()
+    healthgraph.settings.API_URL = server.url
+    try:
+        print "Feed walk: %d pages x %d rounds" % (opts.pages, opts.rounds)
+        run(server, 'unpooled', UnpooledTransport(), opts.rounds)
+        run(server, 'pooled', healthgraph.create_transport(), opts.rounds)
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""Benchmark for the bulk upload of new Fitness Activities.
+
+Posts a stream of generated activities to the local mock server with an
+increasing number of worker threads, reporting throughput and the maximum
+number of requests in flight observed by the server. Then repeats a partially
+failed upload with the same upload log, checking that only the failed items
+are posted again.
+
+Running the benchmark: python bench_upload.py --items 500 --latency 0.02
+
+"""
+
+import os
+import sys
+import time
+import optparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import healthgraph
+from mockserver import MockAPIServer
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+def new_activities(count):
+    """Generate new activities, as read from a device."""
+    start = datetime(2012, 1, 1, 7, 0, 0)
+    for idx in xrange(count):
+        yield {'type': ('Running', 'Cycling', 'Walking',)[idx % 3],
+               'start_time': start + timedelta(hours=idx * 7),
+               'total_distance': 3000.0 + idx % 50 * 100,
+               'duration': 1200.0 + idx % 40 * 30,
+               'notes': 'Imported activity %d' % idx,}
+
+
+def run(server, user, items, workers, window=None):
+    server.reset_counters()
+    start = time.time()
+    results = list(user.upload_fitness_activities(new_activities(items),
+                                                  workers=workers,
+                                                  window=window))
+    elapsed = time.time() - start
+    created = sum(1 for result in results if result.status == 'created')
+    print "%8d %8d %10.3f %12.1f %10d" % (workers, created, elapsed,
+                                          created / elapsed,
+                                          server.max_in_flight)
+
+
+def run_resume(server, user, items, failures):
+    log = healthgraph.MemoryUploadLog()
+    posted = len(server.posted)
+    server.fail_next(503, failures)
+    first = list(user.upload_fitness_activities(new_activities(items),
+                                                workers=8, log=log))
+    second = list(user.upload_fitness_activities(new_activities(items),
+                                                 workers=8, log=log))
+    print
+    for name, results in (('first run', first), ('second run', second),):
+        counts = {}
+        for result in results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        print "%-12s %s" % (name, ', '.join("%s: %d" % item
+                                            for item in sorted(counts.items())))
+    print "%-12s %d posted for %d items" % ('server',
+                                           len(server.posted) - posted, items)
+
+
+def main(argv=None):
+    parser = optparse.OptionParser()
+    parser.add_option('-n', '--items', dest='items', type='int', default=500,
+                      help='Activities uploaded per run.')
+    parser.add_option('-l', '--latency', dest='latency', type='float',
+                      default=0.02, help='Request latency in seconds.')
+    parser.add_option('-f', '--failures', dest='failures', type='int',
+                      default=20, help='Failed requests in resume check.')
+    opts = parser.parse_args(argv)[0]
+    server = MockAPIServer(latency=opts.latency)
+    server.start()
+    healthgraph.settings.API_URL = server.url
+    try:
+        session = healthgraph.Session('token')
+        user = healthgraph.User(session=session)
+        print "%8s %8s %10s %12s %10s" % ('workers', 'created', 'seconds',
+                                          'items/sec', 'in flight')
+        for workers in (1, 4, 8, 16, 32):
+            run(server, user, opts.items, workers)
+        run_resume(server, user, opts.items, opts.failures)
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,530 @@
+#!/usr/bin/env python
+"""Local stand-in for the Health Graph API used by the benchmarks.
+
+The server generates deterministic User, Profile, Settings, Records, feed and
+Fitness Activity detail payloads. Request latency and connection setup latency
+(standing in for the TCP + TLS handshake with api.runkeeper.com) can be
+configured for measuring the effect of network round trips.
+
+Responses are compressed with gzip or deflate when the client accepts it,
+unless compression is disabled. New activities and measurements posted to the
+feeds are accepted with 201 Created and kept in memory (not added to the feeds).
+
+Running standalone: python mockserver.py --port 8080 --latency 0.05
+
+"""
+
+import sys
+import time
+import json
+import zlib
+import hashlib
+import urlparse
+import optparse
+import threading
+import SocketServer
+import BaseHTTPServer
+from datetime import datetime, timedelta
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+DAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun',)
+MONTH_NAMES = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep',
+               'Oct', 'Nov', 'Dec',)
+ACTIVITY_TYPES = ('Running', 'Cycling', 'Walking', 'Swimming', 'Hiking',)
+ENTRY_MODES = ('API', 'Web',)
+BASE_TIME = datetime(2012, 6, 30, 7, 30, 0)
+
+
+def format_datetime(val):
+    return "%s, %d %s %d %02d:%02d:%02d" % (DAY_NAMES[val.weekday()], val.day,
+                                            MONTH_NAMES[val.month - 1], val.year,
+                                            val.hour, val.minute, val.second)
+
+
+class MockData(object):
+    """Deterministic payload generator for the mock API."""
+
+    feeds = {'/fitnessActivities': 'fitness',
+             '/strengthTrainingActivities': 'strength',
+             '/weight': 'weight',
+             '/sleep': 'sleep',}
+
+    def __init__(self, num_items=200, path_points=600):
+        self.num_items = num_items
+        self.path_points = path_points
+        self.modified = {}
+        self._details = {}
+
+    def user(self):
+        return {'userID': 1234567,
+                'profile': '/profile',
+                'settings': '/settings',
+                'fitness_activities': '/fitnessActivities',
+                'strength_training_activities': '/strengthTrainingActivities',
+                'background_activities': '/backgroundActivities',
+                'sleep': '/sleep',
+                'nutrition': '/nutrition',
+                'weight': '/weight',
+                'general_measurements': '/generalMeasurements',
+                'diabetes': '/diabetes',
+                'records': '/records',
+                'team': '/team',}
+
+    def profile(self):
+        return {'name': 'John Doe',
+                'location': 'Istanbul, Turkey',
+                'athlete_type': 'Runner',
+                'gender': 'M',
+                'birthday': 'Sat, 1 Jan 1983 00:00:00',
+                'elite': 'false',
+                'profile': 'http://runkeeper.com/user/johndoe',
+                'small_picture': 'http://example.com/small.jpg',
+                'normal_picture': 'http://example.com/normal.jpg',
+                'medium_picture': 'http://example.com/medium.jpg',
+                'large_picture': 'http://example.com/large.jpg',}
+
+    def settings(self):
+        return {'facebook_connected': 'false',
+                'twitter_connected': 'false',
+                'foursquare_connected': 'false',
+                'share_fitness_activities': 'Everyone',
+                'share_map': 'Friends',
+                'post_fitness_activity_facebook': 'false',
+                'post_fitness_activity_twitter': 'false',
+                'distance_units': 'km',
+                'weight_units': 'kg',
+                'first_day_of_week': 1,}
+
+    def records(self):
+        records = []
+        for act_type in ACTIVITY_TYPES:
+            stats = [{'stat_type': 'OVERALL', 'value': 1234567.8},
+                     {'stat_type': 'THIS_WEEK', 'value': 21.3},
+                     {'stat_type': 'LAST_WEEK', 'value': 35.1},
+                     {'stat_type': 'THIS_MONTH', 'value': 80.2},
+                     {'stat_type': 'LAST_MONTH', 'value': 143.7},
+                     {'stat_type': 'BEST_ACTIVITY', 'value': 42.2,
+                      'date': 'Sun, 6 May 2012 09:00:00'},
+                     {'stat_type': 'BEST_WEEK', 'value': 61.0,
+                      'date': 'Mon, 30 Apr 2012 00:00:00'},
+                     {'stat_type': 'BEST_MONTH', 'value': 210.4,
+                      'date': 'Tue, 1 May 2012 00:00:00'},]
+            records.append({'activity_type': act_type, 'stats': stats})
+        return records
+
+    def item_time(self, idx):
+        return BASE_TIME - timedelta(days=idx, hours=idx % 5)
+
+    def modified_time(self, feed, idx):
+        return self.modified.get((feed, idx), self.item_time(idx))
+
+    def touch(self, feed, idx, when=None):
+        """Mark feed item as modified at when (default: now)."""
+        self.modified[(feed, idx)] = when or datetime.now()
+
+    def feed_indexes(self, feed, query):
+        """Return indexes of the items of feed matching the date filters."""
+        item_time = self.item_time
+        modified_time = lambda idx: self.modified_time(feed, idx)
+        filters = []
+        for param, func, cmp_sign in (
+                ('noEarlierThan', item_time, 1),
+                ('noLaterThan', item_time, -1),
+                ('modifiedNoEarlierThan', modified_time, 1),
+                ('modifiedNoLaterThan', modified_time, -1),):
+            if query.has_key(param):
+                limit = datetime.strptime(query[param][0], '%Y-%m-%d').date()
+                filters.append((func, limit, cmp_sign))
+        indexes = []
+        for idx in range(self.num_items):
+            for func, limit, cmp_sign in filters:
+                if cmp(func(idx).date(), limit) == -cmp_sign:
+                    break
+            else:
+                indexes.append(idx)
+        return indexes
+
+    def feed_item(self, feed, idx):
+        timestamp = format_datetime(self.item_time(idx))
+        if feed == 'fitness':
+            return {'type': ACTIVITY_TYPES[idx % len(ACTIVITY_TYPES)],
+                    'start_time': timestamp,
+                    'total_distance': 5000.0 + (idx % 17) * 250.5,
+                    'duration': 1800.0 + (idx % 13) * 60,
+                    'total_calories': 350.0 + idx % 50,
+                    'has_path': 'true',
+                    'entry_mode': ENTRY_MODES[idx % len(ENTRY_MODES)],
+                    'source': 'RunKeeper',
+                    'uri': '/fitnessActivities/%d' % (100000 + idx),}
+        elif feed == 'strength':
+            return {'start_time': timestamp,
+                    'uri': '/strengthTrainingActivities/%d' % (100000 + idx),}
+        elif feed == 'weight':
+            return {'timestamp': timestamp,
+                    'weight': 75.0 + (idx % 7) * 0.3,
+                    'fat_percent': 15.0 + (idx % 5) * 0.1,
+                    'bmi': 23.1,
+                    'uri': '/weight/%d' % (100000 + idx),}
+        elif feed == 'sleep':
+            return {'timestamp': timestamp,
+                    'total_sleep': 420.0 + idx % 60,
+                    'deep': 90.0,
+                    'rem': 100.0,
+                    'light': 200.0,
+                    'awake': 30.0,
+                    'times_woken': 2,
+                    'uri': '/sleep/%d' % (100000 + idx),}
+
+    def feed_page(self, resource, page, page_size, query=None):
+        feed = self.feeds[resource]
+        if query:
+            indexes = self.feed_indexes(feed, query)
+            filter_qs = ''.join('&%s=%s' % (k, v[0])
+                                for k, v in sorted(query.items())
+                                if k not in ('page', 'pageSize'))
+        else:
+            indexes = range(self.num_items)
+            filter_qs = ''
+        size = len(indexes)
+        start = page * page_size
+        stop = min(start + page_size, size)
+        data = {'size': size,
+                'items': [self.feed_item(feed, idx)
+                          for idx in indexes[start:stop]],}
+        if stop < size:
+            data['next'] = '%s?page=%d&pageSize=%d%s' % (resource, page + 1,
+                                                         page_size, filter_qs)
+        if page > 0:
+            data['previous'] = '%s?page=%d&pageSize=%d%s' % (resource, page - 1,
+                                                             page_size,
+                                                             filter_qs)
+        return data
+
+    def fitness_activity(self, idx):
+        start = self.item_time(idx)
+        data = self.feed_item('fitness', idx)
+        data.update({'userID': 1234567,
+                     'equipment': 'None',
+                     'notes': 'Morning run.',
+                     'is_live': 'false',
+                     'climb': 42.0,
+                     'average_heart_rate': 150,
+                     'comments': '/fitnessActivities/%d/comments' % (100000 + idx),
+                     'images': [],})
+        points = self.path_points
+        data['path'] = [{'timestamp': float(i),
+                         'latitude': 41.0 + i * 0.0001,
+                         'longitude': 29.0 + i * 0.0001,
+                         'altitude': 30.0 + (i % 20),
+                         'type': ('start' if i == 0 else
+                                  ('end' if i == points - 1 else 'gps')),}
+                        for i in range(points)]
+        data['heart_rate'] = [{'timestamp': float(i), 'heart_rate': 140 + i % 30}
+                              for i in range(points)]
+        data['distance'] = [{'timestamp': float(i), 'distance': i * 3.1}
+                            for i in range(points)]
+        data['calories'] = [{'timestamp': float(i), 'calories': i * 0.2}
+                            for i in range(points)]
+        if idx > 0:
+            data['next'] = '/fitnessActivities/%d' % (100000 + idx - 1)
+        if idx < self.num_items - 1:
+            data['previous'] = '/fitnessActivities/%d' % (100000 + idx + 1)
+        data['start_time'] = format_datetime(start)
+        return data
+
+    def lookup_json(self, path, query):
+        """Return JSON encoded payload for path. The payloads of Fitness
+        Activity details, which are expensive to generate, are cached.
+
+        """
+        if path.startswith('/fitnessActivities/'):
+            body = self._details.get(path)
+            if body is None:
+                data = self.lookup(path, query)
+                if data is None:
+                    return None
+                body = self._details[path] = json.dumps(data)
+            return body
+        data = self.lookup(path, query)
+        if data is not None:
+            return json.dumps(data)
+        return None
+
+    def lookup(self, path, query):
+        if path == '/user':
+            return self.user()
+        elif path == '/profile':
+            return self.profile()
+        elif path == '/settings':
+            return self.settings()
+        elif path == '/records':
+            return self.records()
+        elif self.feeds.has_key(path):
+            page = int(query.get('page', ['0'])[0])
+            page_size = int(query.get('pageSize', ['25'])[0])
+            return self.feed_page(path, page, page_size, query)
+        elif path.startswith('/fitnessActivities/'):
+            try:
+                idx = int(path.split('/')[2]) - 100000
+            except ValueError:
+                return None
+            if 0 <= idx < self.num_items:
+                return self.fitness_activity(idx)
+        return None
+
+
+class MockRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    wbufsize = -1
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.count_connection()
+        if self.server.connect_latency > 0:
+            time.sleep(self.server.connect_latency)
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data))
+
+    def send_body(self, status, body):
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        encoding = None
+        if status == 200:
+            encoding = self.server.accepted_encoding(
+                                        self.headers.get('Accept-Encoding'))
+        if encoding is not None:
+            body = self.server.compress_body(etag, encoding, body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        if status == 200:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_failure(self, status, retry_after):
+        message = self.responses.get(status, ('Too Many Requests',))[0]
+        body = json.dumps({'error': message})
+        self.send_response(status, message)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if retry_after is not None:
+            self.send_header('Retry-After', str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.count_request()
+        if self.server.latency > 0:
+            time.sleep(self.server.latency)
+        failure = self.server.next_failure()
+        if failure is not None:
+            self.send_failure(*failure)
+            return
+        path, _, qs = self.path.partition('?')
+        body = self.server.data.lookup_json(path, urlparse.parse_qs(qs))
+        if body is not None:
+            self.send_body(200, body)
+        else:
+            self.send_json(404, {'error': 'Not Found'})
+
+    def do_POST(self):
+        self.server.count_request()
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.server.begin_post()
+        try:
+            if self.server.latency > 0:
+                time.sleep(self.server.latency)
+            failure = self.server.next_failure()
+            if failure is not None:
+                self.send_failure(*failure)
+                return
+            path = self.path.partition('?')[0]
+            if not self.server.data.feeds.has_key(path):
+                self.send_json(404, {'error': 'Not Found'})
+                return
+            try:
+                item = json.loads(body)
+            except ValueError:
+                self.send_json(400, {'error': 'Bad Request'})
+                return
+            uri = self.server.add_posted(path, item)
+            self.send_response(201)
+            self.send_header('Location', self.server.url + uri)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        finally:
+            self.server.end_post()
+
+
+class MockAPIServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """Threaded HTTP server emulating the Health Graph API."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0,
+                 connect_latency=0.0, num_items=200, path_points=600,
+                 compress=True):
+        """Initialize mock server.
+
+        @param host:            Bind address.
+        @param port:            Bind port. A free port is picked if 0.
+        @param latency:         Delay in seconds added to every request.
+        @param connect_latency: Delay in seconds added to every new connection.
+        @param num_items:       Number of items in each feed.
+        @param path_points:     Number of points in Fitness Activity streams.
+        @param compress:        Compress responses with gzip or deflate if
+                                accepted by the client.
+
+        """
+        BaseHTTPServer.HTTPServer.__init__(self, (host, port),
+                                           MockRequestHandler)
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.data = MockData(num_items, path_points)
+        self.compress = compress
+        self._compressed = {}
+        self.posted = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = 0
+        self.requests = 0
+        self._failures = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://%s:%d" % self.server_address
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def fail_next(self, status, count=1, retry_after=None):
+        """Respond to the next count requests with an error status.
+
+        @param status:      HTTP status code (e.g. 429 or 503).
+        @param count:       Number of requests.
+        @param retry_after: Value of the Retry-After header, if any.
+
+        """
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def next_failure(self):
+        with self._lock:
+            if self._failures:
+                return self._failures.pop(0)
+            return None
+
+    def begin_post(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end_post(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def add_posted(self, path, item):
+        """Keep posted item and return the URI of the new resource."""
+        with self._lock:
+            self.posted.append((path, item))
+            return '%s/%d' % (path, 200000 + len(self.posted))
+
+    def accepted_encoding(self, accept_encoding):
+        """Return the content coding used for a response (gzip or deflate),
+        or None if the response is sent uncompressed.
+
+        """
+        if not self.compress or not accept_encoding:
+            return None
+        codings = [val.split(';')[0].strip()
+                   for val in accept_encoding.split(',')]
+        for encoding in ('gzip', 'deflate',):
+            if encoding in codings:
+                return encoding
+        return None
+
+    def compress_body(self, etag, encoding, body):
+        """Return compressed body. Compressed bodies are cached by ETag."""
+        key = (etag, encoding)
+        compressed = self._compressed.get(key)
+        if compressed is None:
+            if encoding == 'gzip':
+                compressor = zlib.compressobj(6, zlib.DEFLATED,
+                                              16 + zlib.MAX_WBITS)
+            else:
+                compressor = zlib.compressobj(6)
+            compressed = compressor.compress(body) + compressor.flush()
+            self._compressed[key] = compressed
+        return compressed
+
+    def reset_counters(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+            self.max_in_flight = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main(argv=None):
+    parser = optparse.OptionParser()
+    parser.add_option('-p', '--port', dest='port', type='int', default=8080)
+    parser.add_option('-l', '--latency', dest='latency', type='float',
+                      default=0.0)
+    parser.add_option('-c', '--connect-latency', dest='connect_latency',
+                      type='float', default=0.0)
+    parser.add_option('-n', '--num-items', dest='num_items', type='int',
+                      default=200)
+    parser.add_option('--no-compress', dest='compress', action='store_false',
+                      default=True, help='Send uncompressed responses.')
+    opts = parser.parse_args(argv)[0]
+    server = MockAPIServer(port=opts.port, latency=opts.latency,
+                           connect_latency=opts.connect_latency,
+                           num_items=opts.num_items, compress=opts.compress)
+    print "Serving mock Health Graph API at %s" % server.url
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
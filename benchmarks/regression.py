@@ -0,0 +1,85 @@
+"""Comparison of benchmark results with a baseline, shared by the benchmark
+suite and the parser microbenchmarks.
+
+Results are dictionaries mapping benchmark (or scenario) names to dictionaries
+of metrics. Metrics whose names end with one of LOWER_IS_BETTER are better
+when lower (times, request counts, memory); all others are better when higher
+(throughput).
+
+"""
+
+import json
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+LOWER_IS_BETTER = ('seconds', 'requests', 'bytes_per_item',)
+
+
+def lower_is_better(metric):
+    return any(metric.endswith(suffix) for suffix in LOWER_IS_BETTER)
+
+def best_of(results):
+    """Return the best value of each metric in a list of metric dictionaries."""
+    best = {}
+    for result in results:
+        for metric, value in result.items():
+            if metric not in best:
+                best[metric] = value
+            elif lower_is_better(metric):
+                best[metric] = min(best[metric], value)
+            else:
+                best[metric] = max(best[metric], value)
+    return best
+
+
+def load_report(path):
+    with open(path) as fp:
+        return json.load(fp)
+
+def save_report(path, report):
+    with open(path, 'w') as fp:
+        json.dump(report, fp, indent=2, sort_keys=True)
+
+
+def compare(baseline, results, threshold, width=52):
+    """Print the changes of results relative to baseline and return the list
+    of (name, metric) tuples that regressed by more than threshold percent.
+
+    @param baseline:  Baseline results.
+    @param results:   Current results.
+    @param threshold: Maximum change for the worse in percent.
+    @param width:     Width of the name column.
+    @return:          List of (name, metric) tuples.
+
+    """
+    regressions = []
+    print
+    print "%-*s %-20s %14s %14s %9s" % (width, 'name', 'metric', 'baseline',
+                                        'current', 'change')
+    for name in sorted(results):
+        base_result = baseline.get(name, {})
+        for metric, value in sorted(results[name].items()):
+            base_value = base_result.get(metric)
+            if not base_value:
+                print "%-*s %-20s %14s %14.2f" % (width, name, metric, '-',
+                                                  value)
+                continue
+            change = (value - base_value) * 100.0 / base_value
+            if lower_is_better(metric):
+                worse = change > threshold
+            else:
+                worse = change < -threshold
+            flag = ''
+            if worse:
+                flag = 'REGRESSION'
+                regressions.append((name, metric))
+            print "%-*s %-20s %14.2f %14.2f %+8.1f%% %s" % (
+                width, name, metric, base_value, value, change, flag)
+    return regressions
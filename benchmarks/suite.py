@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+"""Benchmark suite for the Health Graph client using the local mock server.
+
+Runs the following scenarios through the public API of the client against
+an in-process MockAPIServer with configurable latency and feed size:
+
+    feed_walk            Iterating the Fitness Activity feed page by page.
+    feed_walk_parallel   Iterating the feed retrieving pages concurrently.
+    detail_fetch         Retrieving FitnessActivity details one by one.
+    detail_fetch_bulk    Retrieving details with iter_activity_details.
+    records              Retrieving PersonalRecords.
+    parse_feed           Parsing feed pages (served from the response cache).
+    scan_feed_lazy       Reading two properties of feed items with lazy 
+                         parsing (served from the response cache).
+    parse_activity       Parsing FitnessActivity details (from the cache).
+    memory_feed_items    Memory held by standard and compact feed items.
+
+Each scenario is run --repeat times and the best result is reported. Reports
+can be saved as JSON and compared with the report of another version; changes
+beyond the threshold are flagged.
+
+Running the suite:   python suite.py --output report-0.3.0.json
+Comparing versions:  python suite.py --compare report-0.3.0.json
+
+"""
+
+import os
+import sys
+import time
+import platform
+import optparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+import healthgraph
+from mockserver import MockAPIServer
+from bench_memory import deep_sizeof
+from regression import best_of, compare, load_report, save_report
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+class Timer(object):
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        self.elapsed = time.time() - self.start
+
+
+def scenario_feed_walk(server, opts):
+    session = healthgraph.Session('token')
+    user = healthgraph.User(session=session)
+    server.reset_counters()
+    with Timer() as timer:
+        items = sum(1 for _ in user.get_fitness_activity_iter())
+    return {'seconds': timer.elapsed, 'items_per_sec': items / timer.elapsed,
+            'requests': server.requests,}
+
+def scenario_feed_walk_parallel(server, opts):
+    session = healthgraph.Session('token')
+    user = healthgraph.User(session=session)
+    server.reset_counters()
+    with Timer() as timer:
+        items = sum(1 for _ in user.get_fitness_activity_iter(
+                                                    workers=opts.workers))
+    return {'seconds': timer.elapsed, 'items_per_sec': items / timer.elapsed,
+            'requests': server.requests,}
+
+def scenario_detail_fetch(server, opts):
+    session = healthgraph.Session('token')
+    user = healthgraph.User(session=session)
+    feed_items = list(user.get_fitness_activity_iter(limit=opts.details))
+    server.reset_counters()
+    with Timer() as timer:
+        for item in feed_items:
+            item.get_activity_detail()
+    return {'seconds': timer.elapsed,
+            'activities_per_sec': len(feed_items) / timer.elapsed,
+            'requests': server.requests,}
+
+def scenario_detail_fetch_bulk(server, opts):
+    session = healthgraph.Session('token')
+    user = healthgraph.User(session=session)
+    feed_iter = user.get_fitness_activity_iter(limit=opts.details)
+    server.reset_counters()
+    with Timer() as timer:
+        count = sum(1 for _ in feed_iter.iter_activity_details(
+                                                    workers=opts.workers))
+    return {'seconds': timer.elapsed,
+            'activities_per_sec': count / timer.elapsed,
+            'requests': server.requests,}
+
+def scenario_records(server, opts):
+    session = healthgraph.Session('token')
+    user = healthgraph.User(session=session)
+    rounds = 20
+    server.reset_counters()
+    with Timer() as timer:
+        for _ in range(rounds):
+            user.get_records()
+    return {'seconds': timer.elapsed, 'records_per_sec': rounds / timer.elapsed,
+            'requests': server.requests,}
+
+def scenario_parse_feed(server, opts):
+    session = healthgraph.Session('token', cache=healthgraph.ResponseCache())
+    user = healthgraph.User(session=session)
+    list(user.get_fitness_activity_iter())
+    server.reset_counters()
+    with Timer() as timer:
+        items = sum(1 for _ in user.get_fitness_activity_iter())
+    return {'seconds': timer.elapsed, 'items_per_sec': items / timer.elapsed,}
+
+def scenario_scan_feed_lazy(server, opts):
+    session = healthgraph.Session('token', cache=healthgraph.ResponseCache())
+    user = healthgraph.User(session=session)
+    list(user.get_fitness_activity_iter())
+    with Timer() as timer:
+        items = sum(1 for item in user.get_fitness_activity_iter(lazy_parse=True)
+                    if item['type'] and item['start_time'])
+    return {'seconds': timer.elapsed, 'items_per_sec': items / timer.elapsed,}
+
+def scenario_parse_activity(server, opts):
+    session = healthgraph.Session('token', cache=healthgraph.ResponseCache())
+    user = healthgraph.User(session=session)
+    feed_items = list(user.get_fitness_activity_iter(limit=opts.details))
+    for item in feed_items:
+        item.get_activity_detail()
+    with Timer() as timer:
+        for item in feed_items:
+            item.get_activity_detail()
+    return {'seconds': timer.elapsed,
+            'activities_per_sec': len(feed_items) / timer.elapsed,}
+
+def scenario_memory_feed_items(server, opts):
+    session = healthgraph.Session('token')
+    user = healthgraph.User(session=session)
+    items = list(user.get_fitness_activity_iter())
+    standard = deep_sizeof(items, (session,)) / float(len(items))
+    items = list(user.get_fitness_activity_iter(compact=True))
+    compact = deep_sizeof(items, (session,)) / float(len(items))
+    return {'bytes_per_item': standard, 'compact_bytes_per_item': compact,}
+
+
+SCENARIOS = (('feed_walk', scenario_feed_walk),
+             ('feed_walk_parallel', scenario_feed_walk_parallel),
+             ('detail_fetch', scenario_detail_fetch),
+             ('detail_fetch_bulk', scenario_detail_fetch_bulk),
+             ('records', scenario_records),
+             ('parse_feed', scenario_parse_feed),
+             ('scan_feed_lazy', scenario_scan_feed_lazy),
+             ('parse_activity', scenario_parse_activity),
+             ('memory_feed_items', scenario_memory_feed_items),)
+
+
+def run_suite(opts, names):
+    server = MockAPIServer(latency=opts.latency,
+                           num_items=opts.pages * healthgraph.settings.DEFAULT_PAGE_SIZE,
+                           path_points=opts.path_points)
+    server.start()
+    healthgraph.settings.API_URL = server.url
+    results = {}
+    try:
+        for name, func in SCENARIOS:
+            if names and name not in names:
+                continue
+            results[name] = best_of([func(server, opts)
+                                     for _ in range(opts.repeat)])
+            print_result(name, results[name])
+    finally:
+        server.stop()
+    return {'version': healthgraph.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'config': {'latency': opts.latency, 'pages': opts.pages,
+                       'details': opts.details, 'workers': opts.workers,
+                       'path_points': opts.path_points,
+                       'repeat': opts.repeat,},
+            'results': results,}
+
+
+def print_result(name, result):
+    for metric in sorted(result):
+        print "%-22s %-24s %14.2f" % (name, metric, result[metric])
+
+
+def compare_reports(baseline, report, threshold):
+    """Print the changes of report relative to baseline and return the list of
+    (scenario, metric) tuples that regressed by more than threshold percent.
+
+    """
+    print
+    print "Comparison with version %s (%s):" % (baseline['version'],
+                                                baseline['date'])
+    if baseline['config'] != report['config']:
+        print "Warning: configurations differ: %s / %s" % (baseline['config'],
+                                                           report['config'])
+    return compare(baseline['results'], report['results'], threshold,
+                   width=22)
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage="%prog [options] [scenario ...]")
+    parser.add_option('-l', '--latency', dest='latency', type='float',
+                      default=0.005, help='Request latency in seconds.')
+    parser.add_option('-p', '--pages', dest='pages', type='int', default=20,
+                      help='Pages in feeds.')
+    parser.add_option('-d', '--details', dest='details', type='int',
+                      default=50, help='Activity details retrieved.')
+    parser.add_option('-w', '--workers', dest='workers', type='int',
+                      default=8, help='Threads for concurrent scenarios.')
+    parser.add_option('--path-points', dest='path_points', type='int',
+                      default=600, help='Points in Fitness Activity streams.')
+    parser.add_option('-r', '--repeat', dest='repeat', type='int', default=3,
+                      help='Runs of each scenario; the best is reported.')
+    parser.add_option('-o', '--output', dest='output',
+                      help='Save report as JSON.')
+    parser.add_option('-c', '--compare', dest='compare',
+                      help='Compare with JSON report of earlier run.')
+    parser.add_option('-t', '--threshold', dest='threshold', type='float',
+                      default=10.0, help='Regression threshold in percent.')
+    opts, names = parser.parse_args(argv)
+    report = run_suite(opts, names)
+    if opts.output:
+        save_report(opts.output, report)
+    if opts.compare:
+        if compare_reports(load_report(opts.compare), report, opts.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
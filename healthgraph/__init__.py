@@ -12,13 +12,32 @@ client secret for use with the Health Graph API.
 
 import content_types
 from authmgr import AuthManager
-from sessionmgr import Session, NullSession, init_session, get_session
+from cache import ResponseCache
+from sessionmgr import (Session, AsyncSession, NullSession, SessionPool,
+                        init_session, get_session,
+                        create_transport, init_transport, get_transport,
+                        init_worker_pool, get_worker_pool,
+                        init_rate_limits, get_rate_limits, 
+                        get_single_flight)
+from concurrency import Future, WorkerPool, SingleFlight
+from ratelimit import RateLimits, RetryPolicy
+from metrics import Metrics, get_metrics
+from profiling import Profiler, profile
+from jsondecode import init_decoder, get_decoder, available_decoders
+from parser import LazyPropDict
 from resources import (PersonalRecordType, ResourceLink,
                        User, Profile, Settings, PersonalRecords, 
                        FitnessActivity, FitnessActivitySummary, 
                        FitnessActivityFeedItem, FitnessActivityIter,
                        StrengthActivityFeedItem, StrengthActivityIter,
-                       WeightMeasurementFeedItem, WeightMeasurementIter,)
+                       WeightMeasurementFeedItem, WeightMeasurementIter,
+                       SleepMeasurementFeedItem, SleepMeasurementIter,
+                       CompactItem, compact_item_class,
+                       ColumnarArray,)
+from sync import SyncEngine, SyncStore, MemoryStore
+from store import SQLiteStore
+from upload import (BulkUploader, UploadResult, UploadLog, MemoryUploadLog,
+                    encode_item)
 
 
 __author__ = "Ali Onur Uyar"
@@ -9,8 +9,8 @@ of credentials for accesing the Health Graph API.
 """
 
 import urllib
-import requests
 import settings
+import sessionmgr
 
 __author__ = "Ali Onur Uyar"
 __copyright__ = "Copyright 2012, Ali Onur Uyar"
@@ -30,7 +30,7 @@ class AuthManager(object):
     
     """
     
-    def __init__(self, client_id, client_secret, redirect_uri):
+    def __init__(self, client_id, client_secret, redirect_uri, transport=None):
         """Initialize Authorization Manager.
         
         @param client_id:     Client ID for accessing Health Graph API
@@ -38,11 +38,17 @@ class AuthManager(object):
         @param redirect_uri:  Redirect URI for returning control to client web
                               application after the Authorization Dialog with
                               RunKeeper.com is executed successfully.
+        @param transport:     Transport used for HTTP requests. The connection
+                              pool shared by default is used if None.
         
         """
         self._client_id = client_id
         self._client_secret = client_secret
         self._redirect_uri = redirect_uri
+        if transport is not None:
+            self._transport = transport
+        else:
+            self._transport = sessionmgr.get_transport()
    
     def get_login_url(self, state=None):
         """Generates and returns URL for redirecting to Login Page of RunKeeper,
@@ -100,7 +106,7 @@ class AuthManager(object):
                    'client_id': self._client_id,
                    'client_secret': self._client_secret,
                    'redirect_uri': self._redirect_uri,}
-        req = requests.post(settings.API_ACCESS_TOKEN_URL, data=payload)
+        req = self._transport.post(settings.API_ACCESS_TOKEN_URL, data=payload)
         data = req.json()
         return data.get('access_token')
     
@@ -112,5 +118,5 @@ class AuthManager(object):
         
         """
         payload = {'access_token': access_token,}
-        req = requests.post(settings.API_DEAUTHORIZATION_URL, data=payload) #@UnusedVariable
+        req = self._transport.post(settings.API_DEAUTHORIZATION_URL, data=payload) #@UnusedVariable
         
\ No newline at end of file
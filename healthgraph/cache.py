@@ -0,0 +1,144 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the cache for decoded responses of the Health Graph API.
+
+"""
+
+import time
+import threading
+from collections import OrderedDict
+import settings
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+def _resource_path(resource):
+    """Return resource URI without query string and trailing slash."""
+    return resource.split('?', 1)[0].rstrip('/')
+
+
+class CacheEntry(object):
+    """Decoded response data stored together with its validators."""
+
+    __slots__ = ('data', 'etag', 'last_modified', 'timestamp',)
+
+    def __init__(self, data, etag=None, last_modified=None):
+        self.data = data
+        self.etag = etag
+        self.last_modified = last_modified
+        self.timestamp = time.time()
+
+
+class ResponseCache(object):
+    """LRU cache with TTL for decoded GET responses.
+
+    Entries which are older than the TTL are not discarded right away; they are
+    kept for revalidation with conditional GET requests (If-None-Match /
+    If-Modified-Since) as long as the server provided validators for them.
+
+    The cached data is shared between all users of the cache and must be
+    treated as read-only.
+
+    """
+
+    def __init__(self, max_entries=settings.CACHE_MAX_ENTRIES,
+                 ttl=settings.CACHE_TTL):
+        """Initialize cache.
+
+        @param max_entries: Maximum number of entries. The least recently used
+                            entries are evicted when the limit is exceeded.
+        @param ttl:         Time in seconds a cached response is used without
+                            revalidation.
+
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+
+    @staticmethod
+    def make_key(access_token, resource, content_type=None, params=None):
+        if params:
+            params = tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                                  for k, v in params.items()))
+        else:
+            params = None
+        return (access_token, resource, content_type, params)
+
+    def lookup(self, key):
+        """Return cache entry for key and mark it as recently used.
+
+        @param key: Cache key generated with make_key.
+        @return:    CacheEntry object or None.
+
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+            return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.timestamp < self._ttl
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def store(self, key, data, etag=None, last_modified=None):
+        with self._lock:
+            self.misses += 1
+            self._entries.pop(key, None)
+            self._entries[key] = CacheEntry(data, etag, last_modified)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def revalidate(self, entry):
+        """Mark entry as fresh following a 304 Not Modified response."""
+        with self._lock:
+            self.revalidations += 1
+            entry.timestamp = time.time()
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def invalidate(self, resource):
+        """Discard all entries for resource, including the entries for pages
+        and other query strings of resource, and the entries for the feed
+        containing resource (e.g. /fitnessActivities for 
+        /fitnessActivities/123).
+        
+        """
+        paths = set((_resource_path(resource),))
+        parent = _resource_path(resource).rsplit('/', 1)[0]
+        if parent:
+            paths.add(parent)
+        with self._lock:
+            for key in [k for k in self._entries 
+                        if _resource_path(k[1]) in paths]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'revalidations': self.revalidations,}
@@ -0,0 +1,304 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the thread pool used for making concurrent requests to
+the Health Graph API.
+
+"""
+
+import sys
+import threading
+import weakref
+import Queue
+from collections import deque
+import exceptions
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+class Future(object):
+    """Result of a call executed by a WorkerPool."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self._result = None
+        self._exc_info = None
+
+    def done(self):
+        return self._event.is_set()
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exc_info):
+        self._exc_info = exc_info
+        self._finish()
+
+    def _finish(self):
+        with self._lock:
+            self._event.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+        for func in callbacks:
+            self._call(func)
+
+    def _call(self, func):
+        try:
+            func(self)
+        except:
+            # Errors in callbacks must not stop the worker thread.
+            pass
+
+    def add_done_callback(self, func):
+        """Register function to be called with the Future object as single
+        argument once the call completes. The function is called immediately
+        if the call has already completed.
+
+        @param func: Callback function.
+
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(func)
+                return
+        self._call(func)
+
+    def result(self, timeout=None):
+        """Wait for the call to complete and return its result.
+
+        @param timeout: Maximum time to wait in seconds. Waits indefinitely if
+                        None.
+        @return:        Return value of the call. The exception raised by the
+                        call is re-raised.
+
+        """
+        if not self._event.wait(timeout):
+            raise exceptions.ClientError("Timeout waiting for result.")
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+
+class WorkerPool(object):
+    """Fixed size pool of daemon threads executing submitted calls."""
+
+    def __init__(self, workers):
+        """Initialize pool.
+
+        @param workers: Number of worker threads.
+
+        """
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._closed = False
+        for _ in range(workers):
+            thread = threading.Thread(target=_run_worker, args=(self._queue,))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule call of func with the given arguments.
+
+        @return: Future object for the result of the call.
+
+        """
+        if self._closed:
+            raise exceptions.ClientError("Worker pool is shut down.")
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def shutdown(self):
+        """Discard the calls that have not been started yet and stop the
+        worker threads once the running calls complete.
+
+        """
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                task = self._queue.get_nowait()
+            except Queue.Empty:
+                break
+            if task is not None:
+                task[0].set_exception((exceptions.ClientError,
+                                       exceptions.ClientError("Call cancelled."),
+                                       None))
+        for _ in self._threads:
+            self._queue.put(None)
+
+
+def _run_worker(queue):
+    while True:
+        task = queue.get()
+        if task is None:
+            break
+        future, func, args, kwargs = task
+        try:
+            future.set_result(func(*args, **kwargs))
+        except:
+            future.set_exception(sys.exc_info())
+        # Do not keep the last call and its owner alive while idle.
+        task = future = func = args = kwargs = None
+
+
+class SingleFlight(object):
+    """Coalescing of concurrent identical calls.
+    
+    While a call for a key is in progress, further calls for the same key 
+    wait for it and share its result (or exception) instead of making the
+    call again.
+    
+    """
+    
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+        
+    def do(self, key, func, *args, **kwargs):
+        """Call func with the given arguments unless a call for key is in 
+        progress, and return the result of the call.
+        
+        @param key:  Hashable key identifying the call.
+        @param func: Function.
+        @return:     Return value of the call.
+        
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            if future is None:
+                self.calls += 1
+                future = Future()
+                self._flights[key] = future
+                leader = True
+            else:
+                self.shared += 1
+                leader = False
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args, **kwargs)
+        except:
+            exc_info = sys.exc_info()
+            self._land(key)
+            future.set_exception(exc_info)
+            raise exc_info[0], exc_info[1], exc_info[2]
+        self._land(key)
+        future.set_result(result)
+        return result
+    
+    def _land(self, key):
+        with self._lock:
+            del self._flights[key]
+    
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'shared': self.shared,}
+
+
+# Weak references to live OrderedMapIter objects; the callbacks shut down the
+# worker pools of iterators that are discarded before being exhausted.
+_iter_refs = set()
+
+def _pool_finalizer(pool):
+    def finalize(ref):
+        _iter_refs.discard(ref)
+        pool.shutdown()
+    return finalize
+
+
+class OrderedMapIter(object):
+    """Iterator applying a function to the items of an iterable concurrently
+    and returning the results in the order of the items.
+    
+    The first calls are submitted on initialization, so that results are 
+    being computed before the first one is requested.
+    
+    """
+
+    def __init__(self, func, iterable, workers, window=None):
+        """Initialize iterator.
+
+        @param func:     Function called with each item as single argument.
+        @param iterable: Iterable of items.
+        @param workers:  Number of worker threads.
+        @param window:   Maximum number of calls submitted whose results have
+                         not been returned yet. No limit if None.
+
+        """
+        if workers < 1:
+            raise exceptions.ClientError("Number of workers must be at least 1.")
+        if window is not None and window < 1:
+            raise exceptions.ClientError("Window must be at least 1.")
+        self._func = func
+        self._item_iter = iter(iterable)
+        self._window = window
+        self._pending = deque()
+        self._pool = WorkerPool(workers)
+        self._exhausted = False
+        _iter_refs.add(weakref.ref(self, _pool_finalizer(self._pool)))
+        self._submit()
+
+    def _submit(self):
+        while (not self._exhausted
+               and (self._window is None or len(self._pending) < self._window)):
+            try:
+                item = self._item_iter.next()
+            except StopIteration:
+                self._exhausted = True
+            else:
+                self._pending.append(self._pool.submit(self._func, item))
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if not self._pending:
+            self.close()
+            raise StopIteration
+        future = self._pending.popleft()
+        self._submit()
+        try:
+            return future.result()
+        except:
+            self.close()
+            raise
+
+    def close(self):
+        """Stop the worker threads and discard the results not returned yet."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pending.clear()
+            self._exhausted = True
+
+
+def ordered_map(func, iterable, workers, window=None):
+    """Return iterator applying func to the items of iterable concurrently
+    and returning the results in the order of the items.
+    
+    @param func:     Function called with each item as single argument.
+    @param iterable: Iterable of items.
+    @param workers:  Number of worker threads.
+    @param window:   Maximum number of calls submitted whose results have not
+                     been returned yet. No limit if None.
+    @return:         OrderedMapIter object.
+
+    """
+    return OrderedMapIter(func, iterable, workers, window)
@@ -54,3 +54,9 @@ FRIEND_FEED = 'TeamFeed'
 FRIEND_INVITE = 'Invitation'
 FRIEND_REPLY = 'Reply'
 COMMENT_THREAD = 'CommentThread'
+
+FEEDS = frozenset((FITNESS_ACTIVITY_FEED, STRENGTH_ACTIVITY_FEED,
+                   BACKGROUND_ACTIVITY_FEED, SLEEP_MEASUREMENT_FEED,
+                   NUTRITION_MEASUREMENT_FEED, WEIGHT_MEASUREMENT_FEED,
+                   GENERAL_BODY_MEASUREMENT_FEED, DIABETES_MEASUREMENT_FEED,
+                   FRIEND_FEED,))
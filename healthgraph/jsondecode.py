@@ -0,0 +1,92 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the selection of the JSON decoder backend used for
+decoding API responses.
+
+"""
+
+import json
+import functools
+import settings
+import exceptions
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+_decoders = {'json': json.loads,}
+if ujson is not None:
+    # ujson 1.x rounds floats unless precise_float is set; later versions 
+    # are always precise and do not accept the option.
+    try:
+        ujson.loads('0.1', precise_float=True)
+    except TypeError:
+        _decoders['ujson'] = ujson.loads
+    else:
+        _decoders['ujson'] = functools.partial(ujson.loads, precise_float=True)
+if simplejson is not None:
+    _decoders['simplejson'] = simplejson.loads
+
+_default_decoder = None
+
+
+def available_decoders():
+    """Return names of the installed decoder backends in order of preference
+    (settings.JSON_DECODERS).
+    
+    """
+    return [name for name in settings.JSON_DECODERS if name in _decoders]
+
+def get_decoder(decoder=None):
+    """Return JSON decoder function.
+    
+    @param decoder: Name of backend (ujson, simplejson or json) or function
+                    taking the response body as single argument and raising
+                    ValueError for invalid data. The default decoder is 
+                    returned if None.
+    @return:        Decoder function.
+    
+    """
+    if decoder is None:
+        if _default_decoder is None:
+            init_decoder()
+        return _default_decoder
+    elif callable(decoder):
+        return decoder
+    func = _decoders.get(decoder)
+    if func is None:
+        raise exceptions.ClientError("JSON decoder not available: %s" 
+                                     % decoder)
+    return func
+
+def init_decoder(decoder=None):
+    """Set the default JSON decoder of sessions.
+    
+    @param decoder: Name of backend or decoder function. The first installed 
+                    backend of settings.JSON_DECODERS, falling back to json, 
+                    is used if None.
+    
+    """
+    global _default_decoder
+    if decoder is None:
+        decoder = (available_decoders() or ['json'])[0]
+    _default_decoder = get_decoder(decoder)
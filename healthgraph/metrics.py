@@ -0,0 +1,208 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the collection of request, decoding and parsing metrics
+of the client.
+
+"""
+
+import bisect
+import threading
+import settings
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+class Histogram(object):
+    """Histogram of values with fixed bucket upper bounds."""
+
+    def __init__(self, bounds=settings.METRICS_LATENCY_BUCKETS):
+        """Initialize histogram.
+
+        @param bounds: Sorted upper bounds of buckets. Values above the last
+                       bound are counted in an overflow bucket.
+
+        """
+        self._bounds = tuple(bounds)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self._counts[bisect.bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        """Return dictionary with count, sum, min, max and cumulative bucket
+        counts keyed by upper bound (float('inf') for the overflow bucket).
+
+        """
+        buckets = []
+        total = 0
+        for bound, count in zip(self._bounds + (float('inf'),), self._counts):
+            total += count
+            buckets.append((bound, total))
+        return {'count': self.count, 'sum': self.sum,
+                'min': self.min, 'max': self.max,
+                'buckets': buckets,}
+
+
+class RequestStats(object):
+    """Request metrics for a content type."""
+
+    def __init__(self):
+        self.count = 0
+        self.status = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.bytes_wire = 0
+        self.latency = Histogram()
+
+    def snapshot(self):
+        return {'count': self.count,
+                'status': dict(self.status),
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'bytes_wire': self.bytes_wire,
+                'latency': self.latency.snapshot(),}
+
+
+class Metrics(object):
+    """In-memory registry of client metrics.
+
+    Records requests (count, status codes, bytes and latency) per content type,
+    JSON decoding time per content type and parsing time per resource class.
+    Hooks registered with add_hook are called for each recorded event, for
+    forwarding the metrics to other monitoring systems.
+
+    """
+
+    def __init__(self, enabled=True):
+        """Initialize registry.
+
+        @param enabled: Record metrics if True.
+
+        """
+        self.enabled = enabled
+        self._hooks = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = {}
+            self._decode = {}
+            self._parse = {}
+
+    def add_hook(self, func):
+        """Register function called as func(event, name, values) for each
+        recorded event; event is one of request, decode or parse, name is the
+        content type or resource class and values is a dictionary.
+
+        @param func: Callback function.
+
+        """
+        with self._lock:
+            self._hooks = self._hooks + [func]
+
+    def remove_hook(self, func):
+        with self._lock:
+            self._hooks = [hook for hook in self._hooks if hook != func]
+
+    def _call_hooks(self, event, name, values):
+        for func in self._hooks:
+            try:
+                func(event, name, values)
+            except:
+                # Errors in hooks must not fail requests.
+                pass
+
+    def record_request(self, content_type, method, status, latency,
+                       bytes_sent=0, bytes_received=0, bytes_wire=None):
+        """Record completed HTTP request.
+
+        @param content_type:   Content type of request (content_types module).
+        @param method:         HTTP method.
+        @param status:         HTTP status code or None for connection errors.
+        @param latency:        Time in seconds until the response was received.
+        @param bytes_sent:     Size of request body.
+        @param bytes_received: Size of response body.
+        @param bytes_wire:     Size of response body as transferred, which is
+                               smaller than bytes_received for compressed
+                               responses. (Default: bytes_received)
+
+        """
+        if bytes_wire is None:
+            bytes_wire = bytes_received
+        with self._lock:
+            stats = self._requests.get(content_type)
+            if stats is None:
+                stats = self._requests[content_type] = RequestStats()
+            stats.count += 1
+            stats.status[status] = stats.status.get(status, 0) + 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+            stats.bytes_wire += bytes_wire
+            stats.latency.observe(latency)
+        if self._hooks:
+            self._call_hooks('request', content_type,
+                             {'method': method, 'status': status,
+                              'latency': latency, 'bytes_sent': bytes_sent,
+                              'bytes_received': bytes_received,
+                              'bytes_wire': bytes_wire,})
+
+    def _record_time(self, event, registry, name, seconds):
+        with self._lock:
+            hist = registry.get(name)
+            if hist is None:
+                hist = registry[name] = Histogram()
+            hist.observe(seconds)
+        if self._hooks:
+            self._call_hooks(event, name, {'time': seconds,})
+
+    def record_decode(self, content_type, seconds):
+        """Record time spent decoding JSON response of content type."""
+        self._record_time('decode', self._decode, content_type, seconds)
+
+    def record_parse(self, cls_name, seconds):
+        """Record time spent parsing decoded data into resource class."""
+        self._record_time('parse', self._parse, cls_name, seconds)
+
+    def snapshot(self):
+        """Return copy of the metrics recorded so far.
+
+        @return: Dictionary with the request metrics keyed by content type
+                 (requests), and the histograms of decoding time keyed by
+                 content type (decode) and of parsing time keyed by resource
+                 class (parse).
+
+        """
+        with self._lock:
+            return {'requests': dict((k, v.snapshot())
+                                     for k, v in self._requests.items()),
+                    'decode': dict((k, v.snapshot())
+                                   for k, v in self._decode.items()),
+                    'parse': dict((k, v.snapshot())
+                                  for k, v in self._parse.items()),}
+
+
+_default_metrics = Metrics()
+
+def get_metrics():
+    return _default_metrics
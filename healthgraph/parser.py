@@ -8,7 +8,9 @@ This module contains the classes and methods for parsing Health Graph API data.
 """
 
 import re
+import functools
 from datetime import date, datetime
+from collections import MutableMapping
 import settings
 import exceptions
 
@@ -20,6 +22,11 @@ __version__ = "0.3.0"
 __email__ = "aouyar at gmail.com"
 __status__ = "Development"
 
+
+_date_re = re.compile('\w+,\s*(\d+)\s+(\w+)\s+(\d+)')
+_datetime_re = re.compile('\w+,\s*(\d+)\s+(\w+)\s+(\d+)\s+(\d+):(\d+):(\d+)')
+_parser_cache = {}
+
     
 def parse_bool(val):
     if val is None:
@@ -37,7 +44,15 @@ def parse_date(val):
     if val is None:
         return None
     else:
-        mobj = re.match('\w+,\s*(\d+)\s+(\w+)\s+(\d+)', val)
+        # Fast path for the format used by the API: 'Sat, 1 Jan 2011 00:00:00'
+        parts = val.split()
+        if len(parts) >= 4 and parts[0][-1:] == ',':
+            try:
+                return date(int(parts[3]), settings.MONTH2NUM[parts[2]], 
+                            int(parts[1]))
+            except (ValueError, KeyError):
+                pass
+        mobj = _date_re.match(val)
         if mobj is not None:
             return date(int(mobj.group(3)), 
                         settings.MONTH2NUM[mobj.group(2)],
@@ -49,7 +64,16 @@ def parse_datetime(val):
     if val is None:
         return None
     else:
-        mobj = re.match('\w+,\s*(\d+)\s+(\w+)\s+(\d+)\s+(\d+):(\d+):(\d+)', val)
+        # Fast path for the format used by the API: 'Sat, 1 Jan 2011 00:00:00'
+        parts = val.split()
+        if len(parts) >= 5 and parts[0][-1:] == ',':
+            try:
+                hour, minute, sec = parts[4].split(':')
+                return datetime(int(parts[3]), settings.MONTH2NUM[parts[2]],
+                                int(parts[1]), int(hour), int(minute), int(sec))
+            except (ValueError, KeyError):
+                pass
+        mobj = _datetime_re.match(val)
         if mobj is not None:
             return datetime(int(mobj.group(3)), 
                             settings.MONTH2NUM[mobj.group(2)],
@@ -76,22 +100,205 @@ def parse_distance_km(val):
     except:
         raise exceptions.ParseValueError("Error parsing distance value.")
     
-def parse_resource_dict(prop_defs, data):
-    prop_dict = dict([(k, None) for k in prop_defs])
-    for k,v in data.items():
-        if prop_defs.has_key(k):
-            action = prop_defs[k]
-            if action is None or v is None:
-                prop_dict[k] = v
-            elif callable(action):
-                prop_dict[k] = action(v)
+def compile_resource_parser(prop_defs, fields=None, intern_fields=(), 
+                            as_tuple=False):
+    """Compile resource property definitions into a function converting the
+    data returned by the API into a property dictionary.
+    
+    The generated function builds the dictionary in a single expression with
+    one entry per property, instead of interpreting the definitions for every
+    item.
+    
+    @param prop_defs:     Dictionary mapping property names to parse functions
+                          or None for properties stored without conversion.
+    @param fields:        Sequence of property names to include. All properties
+                          in sorted order if None.
+    @param intern_fields: Names of properties whose values are replaced by a 
+                          single shared copy of equal values.
+    @param as_tuple:      The function returns a tuple of values in the order
+                          of fields instead of a dictionary if True.
+    @return:              Function taking a data dictionary as single argument.
+    
+    """
+    if fields is None:
+        fields = sorted(prop_defs)
+    namespace = {'_intern': {}.setdefault,}
+    lines = ["def parse(data):", 
+             "    get = data.get",]
+    entries = []
+    for idx, k in enumerate(fields):
+        action = prop_defs[k]
+        if action is not None and not callable(action):
+            expr = "None"
+        elif action is None and k not in intern_fields:
+            expr = "get(%r)" % (k,)
+        else:
+            expr = "v%d" % idx
+            lines.append("    v%d = get(%r)" % (idx, k))
+            if action is not None:
+                namespace['_a%d' % idx] = action
+                lines.append("    if v%d is not None: v%d = _a%d(v%d)" 
+                             % (idx, idx, idx, idx))
+            if k in intern_fields:
+                lines.append("    v%d = _intern(v%d, v%d)" % (idx, idx, idx))
+        if as_tuple:
+            entries.append(expr)
         else:
-            pass
-    return prop_dict
+            entries.append("%r: %s" % (k, expr))
+    if as_tuple:
+        lines.append("    return (%s)" % ''.join(e + ', ' for e in entries))
+    else:
+        lines.append("    return {%s}" % ', '.join(entries))
+    exec '\n'.join(lines) in namespace
+    return namespace['parse']
+
+
+class LazyPropDict(MutableMapping):
+    """Property dictionary keeping the decoded JSON data and converting each
+    property on first access. Converted values are memoized.
+    
+    Parse errors are raised when the property is accessed. Deleting properties
+    or adding properties missing from the definitions converts all remaining 
+    properties.
+    
+    Like the dictionaries of the compiled parsers, and unlike compact feed 
+    items, values are not interned (_prop_intern of feed item classes); 
+    string values are those of the decoded JSON data.
+    
+    """
+    
+    def __init__(self, prop_defs, data):
+        """Initialize property dictionary.
+        
+        @param prop_defs: Dictionary mapping property names to parse functions
+                          or None for properties stored without conversion.
+        @param data:      Decoded JSON data.
+        
+        """
+        self._prop_defs = prop_defs
+        self._data = data
+        self._parsed = {}
+        
+    def __getitem__(self, k):
+        try:
+            return self._parsed[k]
+        except KeyError:
+            if self._data is None:
+                raise
+        action = self._prop_defs[k]
+        val = self._data.get(k)
+        if action is not None:
+            if not callable(action):
+                val = None
+            elif val is not None:
+                val = action(val)
+        self._parsed[k] = val
+        return val
+    
+    def _parse_all(self):
+        if self._data is not None:
+            for k in self._prop_defs:
+                self[k]
+            self._data = None
+    
+    def __setitem__(self, k, v):
+        if k not in self:
+            self._parse_all()
+        self._parsed[k] = v
+        
+    def __delitem__(self, k):
+        self._parse_all()
+        del self._parsed[k]
+        
+    def __contains__(self, k):
+        if self._data is None:
+            return k in self._parsed
+        return k in self._prop_defs
+        
+    def __len__(self):
+        if self._data is None:
+            return len(self._parsed)
+        return len(self._prop_defs)
+    
+    def __iter__(self):
+        if self._data is None:
+            return iter(self._parsed)
+        return iter(self._prop_defs)
+    
+    def __repr__(self):
+        return repr(dict(self.items()))
+    
+    @property
+    def parsed(self):
+        """Names of the properties converted so far."""
+        if self._data is None:
+            return list(self._parsed)
+        return [k for k in self._prop_defs if k in self._parsed]
+
+
+def project_prop_defs(prop_defs, fields):
+    """Return the property definitions restricted to fields.
+    
+    @param prop_defs: Dictionary of property definitions.
+    @param fields:    Sequence of property names.
+    @return:          Dictionary of property definitions.
+    
+    """
+    if isinstance(fields, basestring):
+        raise exceptions.ClientError("Fields must be a sequence of property "
+                                     "names, not a string.")
+    unknown = [k for k in fields if k not in prop_defs]
+    if unknown:
+        raise exceptions.ClientError("Unknown fields: %s" % ', '.join(unknown))
+    return dict((k, prop_defs[k]) for k in fields)
+
+def get_resource_parser(prop_defs, lazy=False, fields=None):
+    """Return the compiled parser for resource property definitions. Parsers
+    are compiled once and cached.
+    
+    @param prop_defs: Dictionary of property definitions.
+    @param lazy:      Return function creating a LazyPropDict, which converts
+                      properties on first access, if True.
+    @param fields:    Tuple of the names of the properties to parse; the other
+                      properties are left out. All properties if None.
+    @return:          Function taking a data dictionary as single argument.
+    
+    """
+    if fields is not None and not isinstance(fields, tuple):
+        fields = tuple(fields)
+    key = (id(prop_defs), fields)
+    entry = _parser_cache.get(key)
+    if entry is None or entry[0] is not prop_defs:
+        if fields is None:
+            defs = prop_defs
+        else:
+            defs = project_prop_defs(prop_defs, fields)
+        entry = (prop_defs, compile_resource_parser(defs), defs)
+        _parser_cache[key] = entry
+    if lazy:
+        return functools.partial(LazyPropDict, entry[2])
+    return entry[1]
+    
+def parse_resource_dict(prop_defs, data):
+    return get_resource_parser(prop_defs)(data)
+
+def format_datetime(val):
+    """Format date or datetime in the format used by the API 
+    (e.g. 'Sat, 1 Jan 2011 00:00:00').
+    
+    """
+    if isinstance(val, datetime):
+        hour, minute, sec = val.hour, val.minute, val.second
+    else:
+        hour = minute = sec = 0
+    return "%s, %d %s %d %02d:%02d:%02d" % (settings.NUM2WEEKDAY[val.weekday()],
+                                            val.day, 
+                                            settings.NUM2MONTH[val.month - 1],
+                                            val.year, hour, minute, sec)
 
 def parse_date_param(val):
     if isinstance(val, (date, datetime)):
-        return val.strftime('%y-%m-%d')
+        return val.strftime('%Y-%m-%d')
     else:
         return val
 
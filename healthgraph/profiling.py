@@ -0,0 +1,241 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the opt-in profiling mode, which breaks down the time
+spent by the client into network, decoding, parsing and item creation phases.
+
+"""
+
+import gc
+import time
+import threading
+import cProfile
+import pstats
+import StringIO
+import exceptions
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+PHASES = ('fetch', 'network', 'decode', 'parse', 'items',)
+
+_active = None
+_active_lock = threading.Lock()
+
+
+class _NullPhase(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_null_phase = _NullPhase()
+
+
+class _Phase(object):
+
+    __slots__ = ('_profiler', '_phase', '_name', '_start', '_objects',
+                 '_child_time', '_child_objects',)
+
+    def __init__(self, profiler, phase, name):
+        self._profiler = profiler
+        self._phase = phase
+        self._name = name
+
+    def __enter__(self):
+        self._child_time = 0.0
+        self._child_objects = 0
+        self._profiler._push(self)
+        self._objects = gc.get_count()[0]
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.time() - self._start
+        objects = gc.get_count()[0] - self._objects
+        self._profiler._pop(self, elapsed, objects)
+        return False
+
+
+def phase(phase_name, name):
+    """Return context manager accounting the time spent in the block to
+    phase_name and name (resource class or content type) of the active
+    Profiler. Does nothing if profiling is not active.
+
+    """
+    profiler = _active
+    if profiler is None:
+        return _null_phase
+    return _Phase(profiler, phase_name, name)
+
+
+class Profiler(object):
+    """Context manager breaking down the wall time and the allocations of the
+    client by phase and by resource class or content type.
+
+    Phases:
+        fetch    Retrieving decoded data for a resource class, excluding the
+                 network and decode phases (cache and store lookups, waiting
+                 for identical requests in progress).
+        network  HTTP requests by content type, including retries.
+        decode   JSON decoding by content type.
+        parse    Parsing decoded data by resource class.
+        items    Creating feed items by item class, excluding page retrieval
+                 in the calling thread, but including waiting for pages
+                 retrieved by worker threads.
+
+    The times and allocations of each phase exclude nested phases. Phases in
+    worker threads are included, so the total may exceed the wall time.
+    Allocations are counted as the net number of objects tracked by the garbage
+    collector created in a phase (negative if the phase released more objects
+    than it created); automatic garbage collection is disabled while profiling
+    if track_allocations is True, otherwise the counts are not meaningful.
+
+    Only one profiler may be active at a time.
+
+    """
+
+    def __init__(self, cprofile=False, track_allocations=True):
+        """Initialize profiler.
+
+        @param cprofile:          Also collect cProfile statistics of the
+                                  calling thread if True. See dump_stats.
+        @param track_allocations: Disable automatic garbage collection for
+                                  counting allocations if True.
+
+        """
+        self._cprofile = cprofile
+        self._track_allocations = track_allocations
+        self._profile = None
+        self._stats = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._gc_enabled = None
+        self.wall_time = 0.0
+
+    def __enter__(self):
+        global _active
+        with _active_lock:
+            if _active is not None:
+                raise exceptions.ClientError("Profiler already active.")
+            _active = self
+        if self._track_allocations:
+            self._gc_enabled = gc.isenabled()
+            gc.collect()
+            gc.disable()
+        if self._cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *args):
+        global _active
+        self.wall_time = time.time() - self._start
+        if self._profile is not None:
+            self._profile.disable()
+        if self._gc_enabled:
+            gc.enable()
+        with _active_lock:
+            _active = None
+        return False
+
+    def _push(self, phase_ctx):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(phase_ctx)
+
+    def _pop(self, phase_ctx, elapsed, objects):
+        stack = self._local.stack
+        stack.pop()
+        if stack:
+            parent = stack[-1]
+            parent._child_time += elapsed
+            parent._child_objects += objects
+        key = (phase_ctx._phase, phase_ctx._name)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = [0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += elapsed - phase_ctx._child_time
+            entry[2] += objects - phase_ctx._child_objects
+
+    def stats(self):
+        """Return dictionary mapping (phase, name) tuples to dictionaries with
+        the number of calls, the time in seconds and the allocated objects.
+
+        """
+        with self._lock:
+            return dict((key, {'calls': calls, 'time': elapsed,
+                               'objects': objects})
+                        for key, (calls, elapsed, objects)
+                        in self._stats.items())
+
+    def phase_totals(self):
+        """Return dictionary mapping phases to total time in seconds."""
+        totals = dict((phase_name, 0.0) for phase_name in PHASES)
+        for (phase_name, _), entry in self.stats().items():
+            totals[phase_name] = totals.get(phase_name, 0.0) + entry['time']
+        return totals
+
+    def report(self):
+        """Return the breakdown by phase and name as text."""
+        stats = self.stats()
+        lines = ["%-8s %-32s %8s %10s %7s %10s" % ('phase', 'name', 'calls',
+                                                   'time (s)', '%', 'objects')]
+        wall_time = self.wall_time or 1e-9
+        order = dict((phase_name, idx) for idx, phase_name in enumerate(PHASES))
+        for key in sorted(stats, key=lambda k: (order.get(k[0], len(order)),
+                                                -stats[k]['time'])):
+            entry = stats[key]
+            lines.append("%-8s %-32s %8d %10.4f %6.1f%% %10d" % (
+                key[0], key[1], entry['calls'], entry['time'],
+                entry['time'] * 100 / wall_time, entry['objects']))
+        accounted = sum(entry['time'] for entry in stats.values())
+        lines.append("%-8s %-32s %8s %10.4f %6.1f%%" % (
+            'other', '', '', max(0.0, self.wall_time - accounted),
+            max(0.0, self.wall_time - accounted) * 100 / wall_time))
+        lines.append("%-8s %-32s %8s %10.4f" % ('wall', '', '', self.wall_time))
+        return '\n'.join(lines)
+
+    def dump_stats(self, path):
+        """Write the cProfile statistics to path in the format read by the
+        pstats module. Requires cprofile=True.
+
+        """
+        if self._profile is None:
+            raise exceptions.ClientError("cProfile statistics not collected.")
+        self._profile.dump_stats(path)
+
+    def print_stats(self, sort='cumulative', limit=30):
+        """Return the cProfile statistics as text. Requires cprofile=True."""
+        if self._profile is None:
+            raise exceptions.ClientError("cProfile statistics not collected.")
+        out = StringIO.StringIO()
+        pstats.Stats(self._profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+def profile(cprofile=False, track_allocations=True):
+    """Return Profiler context manager.
+
+    Usage:
+        with healthgraph.profile() as prof:
+            items = list(user.get_fitness_activity_iter())
+        print prof.report()
+
+    """
+    return Profiler(cprofile, track_allocations)
@@ -0,0 +1,256 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the client side rate limiting and the retry policy for
+requests to the Health Graph API.
+
+"""
+
+import time
+import random
+import calendar
+import threading
+from email.utils import parsedate
+import settings
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+class TokenBucket(object):
+    """Token bucket allowing rate requests per second on average, with bursts
+    of up to burst requests.
+
+    """
+
+    def __init__(self, rate, burst=None):
+        """Initialize token bucket.
+
+        @param rate:  Tokens added per second.
+        @param burst: Maximum number of tokens in the bucket. (Default: rate,
+                      but at least 1.)
+
+        """
+        self._rate = float(rate)
+        self._burst = float(burst or max(1, rate))
+        self._tokens = self._burst
+        self._updated = time.time()
+        self._resume = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token and return the time to wait before using it."""
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self._burst,
+                               self._tokens
+                               + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = max(-self._tokens / self._rate, self._resume - now)
+            return max(0, wait)
+
+    def acquire(self):
+        """Block until a request may be made."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def defer(self, delay):
+        """Do not allow requests in the next delay seconds.
+
+        @param delay: Delay in seconds.
+
+        """
+        with self._lock:
+            self._resume = max(self._resume, time.time() + delay)
+
+    def is_idle(self, now=None):
+        """Return True if the bucket is full and no delay is pending, that is,
+        if the bucket is in the same state as a new one.
+
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            return (self._resume <= now
+                    and self._tokens + (now - self._updated) * self._rate
+                        >= self._burst)
+
+
+class RateLimits(object):
+    """Token buckets limiting the request rate of the application and the
+    request rate of each access token.
+
+    The token buckets of access tokens are kept independently of sessions;
+    buckets which are back in their initial state are pruned as the number of
+    access tokens grows.
+
+    """
+
+    def __init__(self, app_rate=None, app_burst=None,
+                 token_rate=None, token_burst=None):
+        """Initialize rate limits.
+
+        @param app_rate:    Maximum requests per second for all access tokens.
+                            No limit if None.
+        @param app_burst:   Maximum burst of requests for all access tokens.
+        @param token_rate:  Maximum requests per second for each access token.
+                            No limit if None.
+        @param token_burst: Maximum burst of requests for each access token.
+
+        """
+        if app_rate is not None:
+            self._app_bucket = TokenBucket(app_rate, app_burst)
+        else:
+            self._app_bucket = None
+        self._token_rate = token_rate
+        self._token_burst = token_burst
+        self._token_buckets = {}
+        self._prune_size = settings.RATE_LIMITS_PRUNE_SIZE
+        self._lock = threading.Lock()
+
+    def _get_token_bucket(self, access_token):
+        if self._token_rate is None:
+            return None
+        with self._lock:
+            bucket = self._token_buckets.get(access_token)
+            if bucket is None:
+                if len(self._token_buckets) >= self._prune_size:
+                    self._prune()
+                bucket = TokenBucket(self._token_rate, self._token_burst)
+                self._token_buckets[access_token] = bucket
+            return bucket
+
+    def _prune(self):
+        """Remove idle token buckets. Called with the lock held."""
+        now = time.time()
+        for access_token in [k for k, bucket in self._token_buckets.items()
+                             if bucket.is_idle(now)]:
+            del self._token_buckets[access_token]
+        self._prune_size = max(settings.RATE_LIMITS_PRUNE_SIZE,
+                               2 * len(self._token_buckets))
+
+    def acquire(self, access_token):
+        """Block until a request may be made with access_token."""
+        if self._app_bucket is not None:
+            self._app_bucket.acquire()
+        bucket = self._get_token_bucket(access_token)
+        if bucket is not None:
+            bucket.acquire()
+
+    def defer(self, access_token, delay):
+        """Do not allow requests with access_token in the next delay
+        seconds.
+
+        """
+        bucket = self._get_token_bucket(access_token)
+        if bucket is not None:
+            bucket.defer(delay)
+        elif self._app_bucket is not None:
+            self._app_bucket.defer(delay)
+
+    def discard(self, access_token):
+        """Discard the state kept for access_token, including pending delays
+        (e.g. when the token is revoked).
+
+        """
+        with self._lock:
+            self._token_buckets.pop(access_token, None)
+
+
+def parse_retry_after(val):
+    """Return delay in seconds for value of Retry-After header, which is
+    either a number of seconds or an HTTP date. Returns None for invalid
+    values.
+
+    """
+    if val is None:
+        return None
+    try:
+        delay = float(val)
+    except ValueError:
+        pass
+    else:
+        if delay != delay:
+            return None
+        return max(0, delay)
+    date_tuple = parsedate(val)
+    if date_tuple is None:
+        return None
+    return max(0, calendar.timegm(date_tuple) - time.time())
+
+
+class RetryPolicy(object):
+    """Retry policy for throttled (429) and failed (5xx) requests, using
+    exponential backoff with full jitter unless the server sends Retry-After.
+
+    POST requests are only retried when throttled, as the server may have
+    processed a request that failed with a server error. Requests are not 
+    retried when the server asks for a delay (Retry-After) longer than 
+    backoff_max; the response is returned to the caller instead.
+
+    """
+
+    def __init__(self, max_retries=settings.RETRY_MAX,
+                 backoff=settings.RETRY_BACKOFF,
+                 backoff_max=settings.RETRY_BACKOFF_MAX,
+                 statuses=settings.RETRY_STATUSES):
+        """Initialize retry policy.
+
+        @param max_retries: Maximum number of retries of a request.
+        @param backoff:     Maximum delay in seconds before the first retry;
+                            doubled for each further retry.
+        @param backoff_max: Maximum delay in seconds before a retry.
+        @param statuses:    HTTP status codes of responses that are retried.
+
+        """
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.statuses = statuses
+
+    def should_retry(self, request_type, attempt, status=None, 
+                     retry_after=None):
+        """Return True if request should be retried.
+
+        @param request_type: HTTP method.
+        @param attempt:      Number of retries made so far.
+        @param status:       HTTP status code of response, or None if the
+                             request failed with a connection error.
+        @param retry_after:  Value of Retry-After header of response.
+
+        """
+        if attempt >= self.max_retries:
+            return False
+        delay = parse_retry_after(retry_after)
+        if delay is not None and delay > self.backoff_max:
+            return False
+        if status == 429:
+            return status in self.statuses
+        if request_type == 'POST':
+            return False
+        return status is None or status in self.statuses
+
+    def get_delay(self, attempt, retry_after=None):
+        """Return delay in seconds before retry.
+
+        @param attempt:     Number of retries made so far.
+        @param retry_after: Value of Retry-After header of response. The
+                            delay requested by the server takes precedence
+                            over the backoff, up to backoff_max.
+
+        """
+        delay = parse_retry_after(retry_after)
+        if delay is not None:
+            return min(delay, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max,
+                                     self.backoff * (2 ** attempt)))
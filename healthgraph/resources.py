@@ -8,14 +8,23 @@ and uploading Fitness Activity and Health Measurements information.
 
 """
 
+import time
 import urllib
 import urlparse
 import inspect
-from collections import namedtuple, MutableMapping
+import functools
+from array import array
+from collections import namedtuple, Mapping, MutableMapping, Sequence
 import settings
 import content_types
+import exceptions
 import sessionmgr
-from parser import (parse_resource_dict, 
+from concurrency import ordered_map
+from upload import BulkUploader
+from metrics import get_metrics
+from profiling import phase
+from parser import (get_resource_parser, compile_resource_parser,
+                    project_prop_defs,
                     parse_bool, 
                     parse_distance, parse_distance_km, 
                     parse_date, parse_datetime, 
@@ -30,6 +39,12 @@ __version__ = "0.3.0"
 __email__ = "aouyar at gmail.com"
 __status__ = "Development"
 
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
     
 class PersonalRecordType:
     """Personal record types."""    
@@ -57,39 +72,80 @@ class PropResourceLink(object):
         return ResourceLink(self._clsname, resource)
     
 
+_projections = {}
+
+def _projection_fields(prop_defs, fields, keep=()):
+    """Return the names of the properties parsed for a projection on fields,
+    which always includes the resource links of prop_defs and the properties
+    in keep, as the methods of resources and items rely on them.
+    
+    @param prop_defs: Dictionary of property definitions.
+    @param fields:    Sequence of property names or None.
+    @param keep:      Tuple of the names of further properties kept.
+    @return:          Tuple of property names or None if fields is None.
+    
+    """
+    if fields is None:
+        return None
+    if isinstance(fields, basestring):
+        raise exceptions.ClientError("Fields must be a sequence of property "
+                                     "names, not a string.")
+    fields = tuple(fields)
+    key = (id(prop_defs), fields, keep)
+    entry = _projections.get(key)
+    if entry is None or entry[0] is not prop_defs:
+        extra = sorted(k for k, v in prop_defs.items()
+                       if (isinstance(v, PropResourceLink) or k in keep)
+                       and k not in fields)
+        entry = (prop_defs, fields + tuple(extra))
+        _projections[key] = entry
+    return entry[1]
+
+
 class ContainerMixin(MutableMapping):
     
     def __getitem__(self, k):
+        self._ensure_loaded()
         return self._prop_dict[k]
     
     def __setitem__(self, k, v):
+        self._ensure_loaded()
         self._prop_dict[k] = v
         
     def __delitem__(self, k):
+        self._ensure_loaded()
         del self._prop_dict[k]
         
     def __len__(self):
+        self._ensure_loaded()
         return len(self._prop_dict)
     
     def __iter__(self):
+        self._ensure_loaded()
         return iter(self._prop_dict)
 
 
-class APIobject(object):
-    _prop_defs = None
-    _prop_main = None
+class LinkedResourceMixin(object):
+    """Methods for following resource links; requires a _session attribute."""
     
-    def __init__(self, session=None):
-        self._prop_dict = {}
-        self._resource = None
-        if session is not None:
-            self._session = session
-        else:
-            self._session = sessionmgr.get_session()
-            
-    def _get_resource_data(self, resource, content_type, params=None):
-        resp = self._session.get(resource, content_type, params)
-        return resp.json() # TODO - Error Checking
+    __slots__ = ()
+    
+    def _submit(self, func, *args, **kwargs):
+        if not isinstance(self._session, sessionmgr.AsyncSession):
+            raise exceptions.ClientError("Asynchronous calls require AsyncSession.")
+        return self._session.submit(func, *args, **kwargs)
+    
+    def _get_linked_resource_async(self, prop, cls_override=None, **kwargs):
+        """Look up the link stored in property prop and retrieve the linked
+        resource on the worker pool, so that the caller is not blocked by 
+        loading the resource holding the link either.
+        
+        """
+        return self._submit(self._get_prop_linked_resource, prop, cls_override,
+                            **kwargs)
+    
+    def _get_prop_linked_resource(self, prop, cls_override=None, **kwargs):
+        return self._get_linked_resource(self[prop], cls_override, **kwargs)
     
     def _get_linked_resource(self, link, cls_override=None, **kwargs):
         if link is not None:
@@ -103,14 +159,35 @@ class APIobject(object):
                 pass
         else:
             return None
+
+
+class APIobject(LinkedResourceMixin):
+    _prop_defs = None
+    _prop_main = None
+    _prop_keep = ()
+    
+    def __init__(self, session=None):
+        self._prop_dict = {}
+        self._resource = None
+        if session is not None:
+            self._session = session
+        else:
+            self._session = sessionmgr.get_session()
+    
+    def _ensure_loaded(self):
+        pass
+            
+    def _get_resource_data(self, resource, content_type, params=None):
+        return self._session.get_data(resource, content_type, params)
         
     def __str__(self):
+        self._ensure_loaded()
         if self._resource is not None:
             prop_strs = ["resource=%s" % self._resource,]
         else:
             prop_strs = []
         for k in self._prop_main:
-            if self._prop_dict[k] is not None:
+            if self._prop_dict.get(k) is not None:
                 prop_strs.append("%s=%s" % (k, self._prop_dict[k]))
         return "%s(%s)" % (self.__class__.__name__,
                            ', '.join(prop_strs))
@@ -120,10 +197,33 @@ class BaseResource(APIobject):
     
     _content_type = None
     
-    def __init__(self, resource = None, session=None, params=None):
+    def __init__(self, resource = None, session=None, params=None, lazy=False,
+                 lazy_parse=False, fields=None):
+        """Initialize resource.
+        
+        @param resource:   Resource URI.
+        @param session:    Session object. The default session is used if None.
+        @param params:     Dictionary of query parameters for loading resource.
+        @param lazy:       The resource is not retrieved from the API until its
+                           properties are accessed for the first time if True.
+        @param lazy_parse: Keep the decoded JSON data and convert properties on
+                           first access if True. (See LazyPropDict.)
+        @param fields:     Sequence of the names of the properties to parse and
+                           store. All properties if None. Resource links (e.g.
+                           uri) are always included.
+        
+        """
         super(BaseResource,self).__init__(session=session)
         self._resource = resource
-        self.load(params)
+        self._params = params
+        self._lazy_parse = lazy_parse
+        if fields is not None:
+            fields = _projection_fields(self._prop_defs, fields, 
+                                        self._prop_keep)
+        self._fields = fields
+        self._loaded = False
+        if not lazy:
+            self.load(params)
             
     @property
     def resource(self):
@@ -133,26 +233,222 @@ class BaseResource(APIobject):
     def content_type(self):
         return self._content_type
     
+    @property
+    def loaded(self):
+        return self._loaded
+    
     def load(self, params=None):
         if self._resource is not None:
-            data = self._get_resource_data(self._resource, self._content_type, 
-                                            params)
-            self._prop_dict = self._parse_data(data)
+            with phase('fetch', self.__class__.__name__):
+                data = self._get_resource_data(self._resource, 
+                                               self._content_type, params)
+            self._prop_dict = self._parse_data_timed(data)
+        self._loaded = True
+        
+    def refresh(self):
+        """Retrieve the resource from the API again."""
+        self.load(self._params)
+        
+    def load_async(self, params=None):
+        """Load resource without blocking. Requires AsyncSession.
+        
+        @param params: Dictionary of query parameters.
+        @return:       Future object resolving to the resource itself.
+        
+        """
+        return self._submit(self._load_and_return, params)
+    
+    def refresh_async(self):
+        return self.load_async(self._params)
+    
+    def _load_and_return(self, params):
+        self.load(params)
+        return self
+        
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load(self._params)
             
     def _parse_data(self, data):
-        return parse_resource_dict(self._prop_defs, data)
+        return get_resource_parser(self._prop_defs, self._lazy_parse,
+                                   self._fields)(data)
+    
+    def _parse_data_timed(self, data):
+        return _parse_timed(self._parse_data, self.__class__.__name__, data)
+
+
+def _parse_timed(parse, clsname, data):
+    """Parse data with function parse, recording parse metrics and the 
+    profiling phase under class name clsname.
+    
+    """
+    metrics = get_metrics()
+    with phase('parse', clsname):
+        if not metrics.enabled:
+            return parse(data)
+        start = time.time()
+        prop_dict = parse(data)
+    metrics.record_parse(clsname, time.time() - start)
+    return prop_dict
 
 
 class ResourceItem(APIobject, ContainerMixin):
 
-    def __init__(self, data=None, session=None):
+    def __init__(self, data=None, session=None, lazy_parse=False, fields=None):
         super(ResourceItem, self).__init__(session=session)
+        if fields is not None:
+            fields = _projection_fields(self._prop_defs, fields, 
+                                        self._prop_keep)
         if data is not None:
-            self._prop_dict = parse_resource_dict(self._prop_defs, data)
+            self._prop_dict = get_resource_parser(self._prop_defs, 
+                                                  lazy_parse, fields)(data)
         else:
             self._prop_dict = {}
             
 
+class CompactItem(LinkedResourceMixin):
+    """Base class for memory efficient, read-mostly variants of feed items.
+    
+    The property values are stored in a tuple in the order of _fields and 
+    repeated strings of the properties listed in _prop_intern of the item 
+    class are shared between items. The mapping interface of items is kept,
+    but properties cannot be deleted. Subclasses are generated from item
+    classes by compact_item_class().
+    
+    """
+    
+    __slots__ = ('_values', '_session',)
+    _fields = ()
+    _index = {}
+    _prop_main = ()
+    
+    def __init__(self, data=None, session=None):
+        if data is not None:
+            self._values = self._parse_row(data)
+        else:
+            self._values = (None,) * len(self._fields)
+        if session is not None:
+            self._session = session
+        else:
+            self._session = sessionmgr.get_session()
+    
+    def __getitem__(self, k):
+        return self._values[self._index[k]]
+    
+    def __setitem__(self, k, v):
+        values = list(self._values)
+        values[self._index[k]] = v
+        self._values = tuple(values)
+        
+    def __delitem__(self, k):
+        raise TypeError("%s does not support deleting properties." 
+                        % self.__class__.__name__)
+    
+    def __len__(self):
+        return len(self._fields)
+    
+    def __iter__(self):
+        return iter(self._fields)
+    
+    def __contains__(self, k):
+        return k in self._index
+    
+    def get(self, k, default=None):
+        idx = self._index.get(k)
+        if idx is None:
+            return default
+        return self._values[idx]
+    
+    def keys(self):
+        return list(self._fields)
+    
+    def values(self):
+        return list(self._values)
+    
+    def items(self):
+        return zip(self._fields, self._values)
+    
+    def iterkeys(self):
+        return iter(self._fields)
+    
+    def itervalues(self):
+        return iter(self._values)
+    
+    def iteritems(self):
+        return iter(self.items())
+    
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+    
+    def __ne__(self, other):
+        return not (self == other)
+    
+    def __str__(self):
+        prop_strs = ["%s=%s" % (k, self[k]) for k in self._prop_main
+                     if self.get(k) is not None]
+        return "%s(%s)" % (self.__class__.__name__, ', '.join(prop_strs))
+    
+Mapping.register(CompactItem)
+
+
+_compact_classes = {}
+
+def compact_item_class(item_cls, fields=None):
+    """Return the CompactItem subclass for an item class. The public methods
+    of the item class are available in the compact class as well.
+    
+    @param item_cls: Item class derived from ResourceItem.
+    @param fields:   Sequence of the names of the properties stored in items.
+                     All properties if None. Resource links are always 
+                     included.
+    @return:         CompactItem subclass.
+    
+    """
+    if fields is not None:
+        fields = _projection_fields(item_cls._prop_defs, fields, 
+                                    item_cls._prop_keep)
+        fields = tuple(sorted(project_prop_defs(item_cls._prop_defs, fields)))
+    cls = _compact_classes.get((item_cls, fields))
+    if cls is None:
+        if fields is None:
+            fields = tuple(sorted(item_cls._prop_defs))
+            key = (item_cls, None)
+        else:
+            key = (item_cls, fields)
+        attrs = {'__slots__': (),
+                 '_fields': fields,
+                 '_index': dict((k, idx) for idx, k in enumerate(fields)),
+                 '_prop_main': item_cls._prop_main,
+                 '_parse_row': staticmethod(compile_resource_parser(
+                                    item_cls._prop_defs, fields,
+                                    item_cls._prop_intern, as_tuple=True)),}
+        for base in reversed(inspect.getmro(item_cls)):
+            if not issubclass(base, APIobject):
+                continue
+            for name, attr in base.__dict__.items():
+                if inspect.isfunction(attr) and not name.startswith('_'):
+                    attrs[name] = attr
+        cls = type('Compact%s' % item_cls.__name__, (CompactItem,), attrs)
+        _compact_classes[key] = cls
+    return cls
+            
+
+def _item_factory(item_cls, compact=False, lazy_parse=False, fields=None):
+    """Return callable creating feed items from decoded JSON data and session."""
+    if fields is not None:
+        fields = _projection_fields(item_cls._prop_defs, fields, 
+                                    item_cls._prop_keep)
+        # Validates the field names before the first item is created.
+        get_resource_parser(item_cls._prop_defs, fields=fields)
+    if compact:
+        return compact_item_class(item_cls, fields)
+    elif lazy_parse or fields is not None:
+        return functools.partial(item_cls, lazy_parse=lazy_parse, fields=fields)
+    else:
+        return item_cls
+
 class ResourceArray(list):
     
     def __init__(self, data=None):
@@ -190,6 +486,158 @@ class ArrayPath(ResourceArray):
         super(ArrayPath, self).__init__(data)
 
 
+_NAN = float('nan')
+_MISSING = object()
+
+
+class ColumnarArray(Sequence):
+    """Columnar storage for the point streams of Fitness Activities.
+    
+    Each property of the points is stored in a typed array (8 bytes per value)
+    instead of a dictionary per point. Missing numeric values are stored as 
+    NaN and string properties are stored as indexes into a list of categories,
+    in which missing values have a category of their own, so that points 
+    without the property are returned without it. Indexing returns points as dictionaries, while column() gives direct access
+    to the values of a property for vectorized computation.
+    
+    """
+    
+    _columns = ()
+    _categorical = ()
+    
+    def __init__(self, data=None):
+        self._data = {}
+        self._categories = {}
+        self._category_codes = {}
+        for name in self._columns:
+            if name in self._categorical:
+                self._data[name] = array('H')
+                self._categories[name] = []
+                self._category_codes[name] = {}
+            else:
+                self._data[name] = array('d')
+        self._len = 0
+        if data:
+            self.extend(data)
+            
+    def _encode(self, name, val):
+        codes = self._category_codes[name]
+        code = codes.get(val)
+        if code is None:
+            code = codes[val] = len(self._categories[name])
+            self._categories[name].append(val)
+        return code
+    
+    def append(self, point):
+        """Append point to arrays.
+        
+        @param point: Dictionary of point properties.
+        
+        """
+        for name in self._columns:
+            val = point.get(name)
+            if name in self._categorical:
+                self._data[name].append(self._encode(name, 
+                                                     point.get(name, _MISSING)))
+            elif val is None:
+                self._data[name].append(_NAN)
+            else:
+                self._data[name].append(val)
+        self._len += 1
+    
+    def extend(self, points):
+        if not isinstance(points, list):
+            points = list(points)
+        for name in self._columns:
+            if name in self._categorical:
+                encode = self._encode
+                vals = [encode(name, point.get(name, _MISSING)) 
+                        for point in points]
+            else:
+                vals = [point.get(name) for point in points]
+                vals = [_NAN if val is None else val for val in vals]
+            self._data[name].extend(vals)
+        self._len += len(points)
+        
+    def column(self, name):
+        """Return the values of a point property.
+        
+        @param name: Property name.
+        @return:     Copy of the column as NumPy array if NumPy is available,
+                     array.array otherwise. Later appends are not reflected.
+                     Categorical columns contain category indexes; see 
+                     categories().
+        
+        """
+        arr = self._data[name]
+        if numpy is not None:
+            return numpy.array(arr, dtype=arr.typecode)
+        else:
+            return array(arr.typecode, arr)
+        
+    def categories(self, name):
+        """Return the categories of a categorical column, indexed by the codes
+        in the column. The category of missing values is returned as None.
+        
+        """
+        return [None if val is _MISSING else val 
+                for val in self._categories[name]]
+    
+    @property
+    def nbytes(self):
+        return sum(arr.itemsize * len(arr) for arr in self._data.values())
+    
+    def __len__(self):
+        return self._len
+    
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in xrange(*idx.indices(self._len))]
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError("%s index out of range" % self.__class__.__name__)
+        point = {}
+        for name in self._columns:
+            val = self._data[name][idx]
+            if name in self._categorical:
+                val = self._categories[name][val]
+                if val is _MISSING:
+                    continue
+            elif val != val:
+                continue
+            point[name] = val
+        return point
+    
+    def __str__(self):
+        cnt = len(self)
+        if cnt > 0:
+            cont_str = 'count: %s' % cnt
+        else:
+            cont_str = '[]'
+        return "%s(%s)" % (self.__class__.__name__,
+                           cont_str)
+    
+    __repr__ = __str__
+
+
+class ColumnarDistance(ColumnarArray):
+    _columns = ('timestamp', 'distance',)
+
+
+class ColumnarHeartRate(ColumnarArray):
+    _columns = ('timestamp', 'heart_rate',)
+
+
+class ColumnarCalories(ColumnarArray):
+    _columns = ('timestamp', 'calories',)
+
+
+class ColumnarPath(ColumnarArray):
+    _columns = ('timestamp', 'latitude', 'longitude', 'altitude', 'type',)
+    _categorical = ('type',)
+
+
 class ArrayImages(ResourceArray):
     def __init__(self, data=None):
         super(ArrayImages, self).__init__(data)
@@ -202,8 +650,11 @@ class ArrayComments(ResourceArray):
         
 class Resource(BaseResource, ContainerMixin):
     
-    def __init__(self, resource = None, params=None, session=None):
-        super(Resource, self).__init__(resource, params=params, session=session)
+    def __init__(self, resource = None, params=None, session=None, lazy=False,
+                 lazy_parse=False, fields=None):
+        super(Resource, self).__init__(resource, params=params, session=session,
+                                       lazy=lazy, lazy_parse=lazy_parse,
+                                       fields=fields)
 
 
 class ResourceFeedIter(BaseResource):
@@ -219,28 +670,129 @@ class ResourceFeedIter(BaseResource):
                  date_min=None, date_max=None, 
                  mod_date_min=None, mod_date_max=None,
                  descending=True,
-                 session=None):
+                 page_size=None, limit=None,
+                 compact=False,
+                 workers=None, prefetch=None,
+                 session=None, lazy_parse=False, fields=None):
+        """Initialize feed iterator.
+        
+        @param resource:     Resource URI of feed.
+        @param date_min:     Only items with date no earlier than date_min.
+        @param date_max:     Only items with date no later than date_max.
+        @param mod_date_min: Only items modified no earlier than mod_date_min.
+        @param mod_date_max: Only items modified no later than mod_date_max.
+        @param descending:   Iterate from the newest to the oldest item if True.
+        @param page_size:    Number of items retrieved per request. 
+                             (Default: settings.DEFAULT_PAGE_SIZE)
+        @param limit:        Maximum number of items to iterate. The page size
+                             is reduced to the limit and no more pages are 
+                             retrieved once the limit is reached.
+        @param compact:      Return memory efficient CompactItem variants of
+                             the feed items if True.
+        @param workers:      Number of threads for retrieving the remaining 
+                             pages of the feed concurrently once the first page
+                             is loaded. Pages are retrieved one by one on demand
+                             if None and prefetch is None.
+        @param prefetch:     Maximum number of pages retrieved in the 
+                             background ahead of the page being iterated. Pages
+                             are read ahead by a single thread unless workers 
+                             is set. No limit if None; must be at least 1 
+                             otherwise.
+        @param session:      Session object. The default session is used if None.
+        @param lazy_parse:   Feed items keep the decoded JSON data and convert
+                             properties on first access if True. Not supported
+                             for compact items.
+        @param fields:       Sequence of the names of the properties parsed and
+                             stored in feed items. All properties if None. 
+                             Resource links (e.g. uri) are always included.
+        
+        """
+        if compact and lazy_parse:
+            raise exceptions.ClientError("Compact items do not support "
+                                         "lazy parsing.")
+        if workers is not None and workers < 1:
+            raise exceptions.ClientError("Number of workers must be at least 1.")
+        if prefetch is not None and prefetch < 1:
+            raise exceptions.ClientError("Prefetch must be at least 1 page.")
         func_params = locals()
-        params = {'pageSize': settings.DEFAULT_PAGE_SIZE,}
+        self._page_size = page_size or settings.DEFAULT_PAGE_SIZE
+        if limit is not None:
+            self._page_size = max(1, min(self._page_size, limit))
+        self._limit = limit
+        self._num_items = 0
+        params = {'pageSize': self._page_size,}
         for func_key, api_key in (('date_min', 'noEarlierThan'),
                                   ('date_max', 'noLaterThan'),
                                   ('mod_date_min', 'modifiedNoEarlierThan'),
-                                  ('mod_date_max', 'modifiedNoLater'),):
+                                  ('mod_date_max', 'modifiedNoLaterThan'),):
             val = parse_date_param(func_params[func_key])
             if val is not None:
                 params[api_key] = val
         super(ResourceFeedIter, self).__init__(resource, params=params,
                                                session=session)
         self._descending = descending
+        self._item_factory = _item_factory(self._item_cls, compact, lazy_parse,
+                                           fields)
         if descending:
             self._iter = iter(self._prop_dict['items'])
         else:
             self._last_page()
             self._iter = reversed(self._prop_dict['items'])
+        if workers is not None or prefetch is not None:
+            # The page function must not reference the iterator; otherwise the
+            # cycle delays the shutdown of the worker threads until cyclic GC.
+            fetch = functools.partial(_fetch_feed_page, self._session,
+                                      self._content_type, 
+                                      self.__class__.__name__,
+                                      get_resource_parser(self._prop_defs,
+                                                          self._lazy_parse,
+                                                          self._fields))
+            self._pages = ordered_map(fetch, self._remaining_pages(), 
+                                      workers or 1, prefetch)
+        else:
+            self._pages = None
             
         
+    @classmethod
+    def _from_items(cls, resource, items, compact=False, session=None,
+                    lazy_parse=False, fields=None):
+        """Return iterator over the decoded JSON data of items, which were 
+        retrieved from a local store, without accessing the API.
+        
+        """
+        feed_iter = cls.__new__(cls)
+        BaseResource.__init__(feed_iter, resource, session=session, lazy=True)
+        feed_iter._prop_dict = {'size': len(items), 'items': items,
+                                'previous': None, 'next': None,}
+        feed_iter._loaded = True
+        feed_iter._page_size = len(items)
+        feed_iter._limit = None
+        feed_iter._num_items = 0
+        feed_iter._descending = True
+        feed_iter._item_factory = _item_factory(cls._item_cls, compact, 
+                                                lazy_parse, fields)
+        feed_iter._iter = iter(items)
+        feed_iter._pages = None
+        return feed_iter
+        
     def count(self):
         return self._prop_dict['size']
+    
+    def close(self):
+        """Stop retrieving pages in the background and shut down the worker
+        threads. Iteration ends with the items retrieved so far.
+        
+        """
+        if self._pages is not None:
+            self._pages.close()
+    
+    def items_async(self):
+        """Retrieve the remaining items without blocking. Requires AsyncSession.
+        
+        @return: Future object resolving to the list of items.
+        
+        """
+        return self._submit(list, self)
              
     def __iter__(self):
         if self._item_cls is not None:
@@ -249,19 +801,80 @@ class ResourceFeedIter(BaseResource):
             pass
     
     def next(self):
-        try:
-            item = self._iter.next()
-        except StopIteration:
-            if self._descending and self._next_page():
-                self._iter = iter(self._prop_dict['items'])
-                item = self._iter.next()
-            elif not self._descending and self._prev_page():
-                self._iter = reversed(self._prop_dict['items'])
+        with phase('items', self._item_cls.__name__):
+            return self._item_factory(self._next_data(), self._session)
+    
+    def iter_data(self):
+        """Return iterator over the decoded JSON data of the remaining items,
+        without creating feed item objects.
+        
+        """
+        while True:
+            try:
+                yield self._next_data()
+            except StopIteration:
+                return
+    
+    def _next_data(self):
+        if self._limit is not None and self._num_items >= self._limit:
+            raise StopIteration
+        while True:
+            try:
                 item = self._iter.next()
-            else:
-                raise StopIteration
-        return self._item_cls(item, self._session)
-                
+                break
+            except StopIteration:
+                if not self._turn_page():
+                    raise StopIteration
+        self._num_items += 1
+        return item
+    
+    def _turn_page(self):
+        if self._pages is not None:
+            try:
+                items = self._pages.next()
+            except StopIteration:
+                return False
+        elif self._descending and self._next_page():
+            items = self._prop_dict['items']
+        elif not self._descending and self._prev_page():
+            items = self._prop_dict['items']
+        else:
+            return False
+        if self._descending:
+            self._iter = iter(items)
+        else:
+            self._iter = reversed(items)
+        return True
+    
+    def _remaining_pages(self):
+        """Return list of (resource, params) tuples for the pages that remain
+        to be retrieved in iteration order, based on the feed size.
+        
+        """
+        if self._descending:
+            link = self._prop_dict.get('next')
+        else:
+            link = self._prop_dict.get('previous')
+        if link is None:
+            return []
+        size = self.count()
+        last_page = self._last_page_num()
+        if self._descending:
+            page_nums = range(1, last_page + 1)
+        else:
+            page_nums = range(last_page - 1, -1, -1)
+        resource, qs = urllib.splitquery(link.resource)
+        pages = []
+        num_items = len(self._prop_dict['items'])
+        for page in page_nums:
+            if self._limit is not None and num_items >= self._limit:
+                break
+            params = urlparse.parse_qs(qs)
+            params['page'] = page
+            pages.append((resource, params))
+            num_items += min(self._page_size, size - page * self._page_size)
+        return pages
+    
     def _prev_page(self):
         link = self._prop_dict.get('previous')
         if link is not None:
@@ -280,13 +893,17 @@ class ResourceFeedIter(BaseResource):
         else:
             return False
         
+    def _last_page_num(self):
+        size = self.count()
+        last_page = size / self._page_size
+        if size % self._page_size == 0:
+            last_page -= 1
+        return last_page
+        
     def _last_page(self):
         link = self._prop_dict.get('next')
         if link is not None:
-            size = self.count()
-            last_page = size / settings.DEFAULT_PAGE_SIZE
-            if size % settings.DEFAULT_PAGE_SIZE == 0:
-                last_page -= 1
+            last_page = self._last_page_num()
             if last_page > 0:
                 self._resource, qs = urllib.splitquery(link.resource)
                 params = urlparse.parse_qs(qs)
@@ -299,10 +916,21 @@ class ResourceFeedIter(BaseResource):
             return False
 
 
+def _fetch_feed_page(session, content_type, clsname, parse, page):
+    """Retrieve a page of a feed and return the parsed items."""
+    resource, params = page
+    with phase('fetch', clsname):
+        data = session.get_data(resource, content_type, params)
+    return _parse_timed(parse, clsname, data)['items']
+
+
 class FeedItem(ResourceItem):
     
-    def __init__(self, data, session=None):
-        super(FeedItem, self).__init__(data, session=session)
+    _prop_intern = ()
+    
+    def __init__(self, data, session=None, lazy_parse=False, fields=None):
+        super(FeedItem, self).__init__(data, session=session, 
+                                       lazy_parse=lazy_parse, fields=fields)
 
 
 class User(Resource):
@@ -323,62 +951,212 @@ class User(Resource):
                   'team': PropResourceLink('FriendIter'),                
                   }
     _prop_main = ('userID',)
+    _prop_keep = ('userID',)
     
-    def __init__(self, session=None):
-        super(User, self).__init__(settings.USER_RESOURCE, session=session)
+    def __init__(self, session=None, lazy=False, lazy_parse=False, 
+                 fields=None):
+        super(User, self).__init__(settings.USER_RESOURCE, session=session,
+                                   lazy=lazy, lazy_parse=lazy_parse, 
+                                   fields=fields)
     
-    def get_profile(self):
-        return self._get_linked_resource(self._prop_dict['profile'])
+    def get_profile(self, lazy=False, lazy_parse=False, fields=None):
+        return self._get_linked_resource(self['profile'], lazy=lazy, 
+                                         lazy_parse=lazy_parse, fields=fields)
         
-    def get_settings(self):
-        return self._get_linked_resource(self._prop_dict['settings'])
+    def get_settings(self, lazy=False, lazy_parse=False, fields=None):
+        return self._get_linked_resource(self['settings'], lazy=lazy, 
+                                         lazy_parse=lazy_parse, fields=fields)
+    
+    def get_records(self, lazy=False):
+        return self._get_linked_resource(self['records'], lazy=lazy)
+    
+    def get_profile_async(self, lazy_parse=False, fields=None):
+        return self._get_linked_resource_async('profile', lazy_parse=lazy_parse,
+                                               fields=fields)
+    
+    def get_settings_async(self, lazy_parse=False, fields=None):
+        return self._get_linked_resource_async('settings', lazy_parse=lazy_parse,
+                                               fields=fields)
+    
+    def get_records_async(self):
+        return self._get_linked_resource_async('records')
+    
+    def _get_feed_iter(self, feed, date_min=None, date_max=None, 
+                       mod_date_min=None, mod_date_max=None, descending=True,
+                       limit=None, compact=False, lazy_parse=False, fields=None,
+                       **kwargs):
+        link = self[feed]
+        store = self._session.store
+        if (link is not None and store is not None 
+            and mod_date_min is None and mod_date_max is None
+            and store.is_fresh(self['userID'], feed)):
+            items = store.query_items(self['userID'], feed, 
+                                      date_min=date_min, date_max=date_max,
+                                      descending=descending, limit=limit)
+            cls = globals().get(link.clsname)
+            return cls._from_items(link.resource, items, compact=compact,
+                                   session=self._session, 
+                                   lazy_parse=lazy_parse, fields=fields)
+        return self._get_linked_resource(link, 
+                                         date_min=date_min, date_max=date_max,
+                                         mod_date_min=mod_date_min, 
+                                         mod_date_max=mod_date_max,
+                                         descending=descending, limit=limit,
+                                         compact=compact, 
+                                         lazy_parse=lazy_parse, fields=fields,
+                                         **kwargs)
+    
+    def _upload(self, feed, content_type, items, workers, window, log, 
+                key_func, retries):
+        link = self[feed]
+        if link is None:
+            raise exceptions.ClientError("Feed %s not available." % feed)
+        uploader = BulkUploader(self._session, workers=workers, window=window,
+                                log=log, key_func=key_func, retries=retries)
+        return uploader.upload(link.resource, content_type, items, 
+                               scope=str(self['userID']))
+    
+    def upload_fitness_activities(self, items, 
+                                  workers=settings.DEFAULT_WORKERS, 
+                                  window=None, log=None, key_func=None, 
+                                  retries=0):
+        """Post new Fitness Activities concurrently.
+        
+        @param items:    Iterable of dictionaries with the properties of the
+                         new activities (NewFitnessActivity); dates and 
+                         datetimes are formatted as expected by the API.
+        @param workers:  Number of threads posting items.
+        @param window:   Maximum number of items in flight or waiting to be
+                         returned. (Default: Twice the number of workers.)
+        @param log:      UploadLog object for skipping items uploaded before.
+        @param key_func: Function returning the upload key of an item.
+        @param retries:  Number of times an item is posted again after a 
+                         connection error or a server error.
+        @return:         Iterator of UploadResult objects in the order of the
+                         items. The upload progresses as results are consumed.
+        
+        """
+        return self._upload('fitness_activities', 
+                            content_types.FITNESS_ACTIVITY_NEW, items, 
+                            workers, window, log, key_func, retries)
+    
+    def upload_strength_activities(self, items, 
+                                   workers=settings.DEFAULT_WORKERS, 
+                                   window=None, log=None, key_func=None, 
+                                   retries=0):
+        return self._upload('strength_training_activities', 
+                            content_types.STRENGTH_ACTIVITY_NEW, items, 
+                            workers, window, log, key_func, retries)
+    
+    def upload_weight_measurements(self, items, 
+                                   workers=settings.DEFAULT_WORKERS, 
+                                   window=None, log=None, key_func=None, 
+                                   retries=0):
+        return self._upload('weight', content_types.WEIGHT_MEASUREMENT_NEW, 
+                            items, workers, window, log, key_func, retries)
+    
+    def upload_sleep_measurements(self, items, 
+                                  workers=settings.DEFAULT_WORKERS, 
+                                  window=None, log=None, key_func=None, 
+                                  retries=0):
+        return self._upload('sleep', content_types.SLEEP_MEASUREMENT_NEW, 
+                            items, workers, window, log, key_func, retries)
+    
+    def get_fitness_activity_iter_async(self, **kwargs):
+        return self._submit(self.get_fitness_activity_iter, **kwargs)
+    
+    def get_strength_activity_iter_async(self, **kwargs):
+        return self._submit(self.get_strength_activity_iter, **kwargs)
+    
+    def get_weight_measurement_iter_async(self, **kwargs):
+        return self._submit(self.get_weight_measurement_iter, **kwargs)
     
-    def get_records(self):
-        return self._get_linked_resource(self._prop_dict['records'])
+    def get_sleep_measurement_iter_async(self, **kwargs):
+        return self._submit(self.get_sleep_measurement_iter, **kwargs)
     
     def get_fitness_activity_iter(self, 
                                   date_min=None, date_max=None, 
                                   mod_date_min=None, mod_date_max=None,
-                                  descending=True):
-        return self._get_linked_resource(self._prop_dict['fitness_activities'],
-                                         date_min=date_min, 
-                                         date_max=date_max,
-                                         mod_date_min=mod_date_min,
-                                         mod_date_max=mod_date_max,
-                                         descending=descending)
+                                  descending=True,
+                                  page_size=None, limit=None,
+                                  compact=False,
+                                  workers=None, prefetch=None,
+                                  lazy_parse=False, fields=None):
+        return self._get_feed_iter('fitness_activities',
+                                   date_min=date_min, 
+                                   date_max=date_max,
+                                   mod_date_min=mod_date_min,
+                                   mod_date_max=mod_date_max,
+                                   descending=descending,
+                                   page_size=page_size,
+                                   limit=limit,
+                                   compact=compact,
+                                   workers=workers,
+                                   prefetch=prefetch,
+                                   lazy_parse=lazy_parse, fields=fields)
     
     def get_strength_activity_iter(self,
                                    date_min=None, date_max=None, 
                                    mod_date_min=None, mod_date_max=None,
-                                   descending=True):
-        return self._get_linked_resource(self._prop_dict['strength_training_activities'],
-                                         date_min=date_min, 
-                                         date_max=date_max,
-                                         mod_date_min=mod_date_min,
-                                         mod_date_max=mod_date_max,
-                                         descending=descending)
+                                   descending=True,
+                                   page_size=None, limit=None,
+                                   compact=False,
+                                   workers=None, prefetch=None,
+                                   lazy_parse=False, fields=None):
+        return self._get_feed_iter('strength_training_activities',
+                                   date_min=date_min, 
+                                   date_max=date_max,
+                                   mod_date_min=mod_date_min,
+                                   mod_date_max=mod_date_max,
+                                   descending=descending,
+                                   page_size=page_size,
+                                   limit=limit,
+                                   compact=compact,
+                                   workers=workers,
+                                   prefetch=prefetch,
+                                   lazy_parse=lazy_parse, fields=fields)
     
     def get_weight_measurement_iter(self,
                                     date_min=None, date_max=None, 
                                     mod_date_min=None, mod_date_max=None,
-                                    descending=True):
-        return self._get_linked_resource(self._prop_dict['weight'],
-                                         date_min=date_min, 
-                                         date_max=date_max,
-                                         mod_date_min=mod_date_min,
-                                         mod_date_max=mod_date_max,
-                                         descending=descending)
+                                    descending=True,
+                                    page_size=None, limit=None,
+                                    compact=False,
+                                    workers=None, prefetch=None,
+                                    lazy_parse=False, fields=None):
+        return self._get_feed_iter('weight',
+                                   date_min=date_min, 
+                                   date_max=date_max,
+                                   mod_date_min=mod_date_min,
+                                   mod_date_max=mod_date_max,
+                                   descending=descending,
+                                   page_size=page_size,
+                                   limit=limit,
+                                   compact=compact,
+                                   workers=workers,
+                                   prefetch=prefetch,
+                                   lazy_parse=lazy_parse, fields=fields)
     
     def get_sleep_measurement_iter(self,
                                     date_min=None, date_max=None, 
                                     mod_date_min=None, mod_date_max=None,
-                                    descending=True):
-        return self._get_linked_resource(self._prop_dict['sleep'],
-                                         date_min=date_min, 
-                                         date_max=date_max,
-                                         mod_date_min=mod_date_min,
-                                         mod_date_max=mod_date_max,
-                                         descending=descending)
+                                    descending=True,
+                                    page_size=None, limit=None,
+                                    compact=False,
+                                    workers=None, prefetch=None,
+                                    lazy_parse=False, fields=None):
+        return self._get_feed_iter('sleep',
+                                   date_min=date_min, 
+                                   date_max=date_max,
+                                   mod_date_min=mod_date_min,
+                                   mod_date_max=mod_date_max,
+                                   descending=descending,
+                                   page_size=page_size,
+                                   limit=limit,
+                                   compact=compact,
+                                   workers=workers,
+                                   prefetch=prefetch,
+                                   lazy_parse=lazy_parse, fields=fields)
 
 class Profile(Resource):
     
@@ -397,8 +1175,10 @@ class Profile(Resource):
                   }
     _prop_main = ('name', 'gender', 'birthday',)
     
-    def __init__(self, resource, session=None):
-        super(Profile, self).__init__(resource, session=session)
+    def __init__(self, resource, session=None, lazy=False, lazy_parse=False,
+                 fields=None):
+        super(Profile, self).__init__(resource, session=session, lazy=lazy,
+                                      lazy_parse=lazy_parse, fields=fields)
 
 
 class Settings(Resource):
@@ -436,16 +1216,18 @@ class Settings(Resource):
                   'first_day_of_week': None,
                   }
     
-    def __init__(self, resource, session=None):
-        super(Settings, self).__init__(resource, session=session)
+    def __init__(self, resource, session=None, lazy=False, lazy_parse=False,
+                 fields=None):
+        super(Settings, self).__init__(resource, session=session, lazy=lazy,
+                                       lazy_parse=lazy_parse, fields=fields)
       
 
 class PersonalRecords(Resource):
     
     _content_type = content_types.PERSONAL_RECORDS
 
-    def __init__(self, resource, session=None):
-        super(PersonalRecords, self).__init__(resource, session=session)
+    def __init__(self, resource, session=None, lazy=False):
+        super(PersonalRecords, self).__init__(resource, session=session, lazy=lazy)
 
     def _parse_data(self, data):
         prop_dict = {'totals': {}, 'bests': {},}
@@ -474,23 +1256,23 @@ class PersonalRecords(Resource):
         return prop_dict
     
     def get_activity_types(self):
-        return self._prop_dict.keys()
+        return self.keys()
     
     def get_totals(self):
-        return self._prop_dict['totals']
+        return self['totals']
     
     def get_bests(self):
-        return self._prop_dict['bests']
+        return self['bests']
     
     def get_activity_totals(self, activity_type):
         try:
-            return self._prop_dict['totals'][activity_type]
+            return self['totals'][activity_type]
         except KeyError:
             return None
     
     def get_activity_bests(self, activity_type):
         try:
-            return self._prop_dict['bests'][activity_type]
+            return self['bests'][activity_type]
         except KeyError:
             return None
 
@@ -538,19 +1320,91 @@ class FitnessActivity(Resource):
                   'nearest_teammate_diabetes': None,
                   }
     
+    _columnar_prop_defs = dict(_prop_defs, 
+                               distance=ColumnarDistance,
+                               heart_rate=ColumnarHeartRate,
+                               calories=ColumnarCalories,
+                               path=ColumnarPath)
+    
+    _stream_factories = {'distance': ColumnarDistance,
+                         'heart_rate': ColumnarHeartRate,
+                         'calories': ColumnarCalories,
+                         'path': ColumnarPath,}
+    
+    # Streams are decoded into ColumnarArray objects by the StreamDecoder.
+    _streaming_prop_defs = dict(_prop_defs, 
+                                distance=None,
+                                heart_rate=None,
+                                calories=None,
+                                path=None)
+    
     _prop_main = ('type', 'start_time',)
     
-    def __init__(self, resource, session=None):
-        super(FitnessActivity, self).__init__(resource, session=session)
+    def __init__(self, resource, session=None, lazy=False, columnar=False,
+                 streaming=False, lazy_parse=False, fields=None):
+        """Initialize Fitness Activity.
+        
+        @param resource: Resource URI.
+        @param session:  Session object. The default session is used if None.
+        @param lazy:     The resource is not retrieved from the API until its
+                         properties are accessed for the first time if True.
+        @param columnar:  Store the distance, heart_rate, calories and path
+                          streams as ColumnarArray objects if True.
+        @param streaming: Decode the response incrementally while it is being
+                          read, appending the points of the streams directly
+                          to ColumnarArray objects, if True. Reduces the peak 
+                          memory use for activities with long streams. 
+                          Implies columnar; the response is not cached.
+        @param lazy_parse: Keep the decoded JSON data and convert properties on
+                           first access if True. (See LazyPropDict.)
+        @param fields:     Sequence of the names of the properties to parse and
+                           store. All properties if None. Resource links are
+                           always included.
+        
+        """
+        self._columnar = columnar or streaming
+        self._streaming = streaming
+        super(FitnessActivity, self).__init__(resource, session=session, lazy=lazy,
+                                              lazy_parse=lazy_parse,
+                                              fields=fields)
+        
+    def _get_resource_data(self, resource, content_type, params=None):
+        if self._streaming:
+            return self._session.get_data_stream(resource, content_type, params,
+                                                 self._stream_factories)
+        else:
+            return self._session.get_data(resource, content_type, params)
+        
+    def _parse_data(self, data):
+        if self._streaming:
+            prop_defs = self._streaming_prop_defs
+        elif self._columnar:
+            prop_defs = self._columnar_prop_defs
+        else:
+            prop_defs = self._prop_defs
+        return get_resource_parser(prop_defs, self._lazy_parse, 
+                                   self._fields)(data)
 
-    def get_comment_thread(self):
-        return self._get_linked_resource(self._prop_dict['comments'])
+    def get_comment_thread(self, lazy=False, lazy_parse=False, fields=None):
+        return self._get_linked_resource(self['comments'], lazy=lazy, 
+                                         lazy_parse=lazy_parse, fields=fields)
 
-    def get_prev_activity(self):
-        return self._get_linked_resource(self._prop_dict['previous'])
+    def get_prev_activity(self, lazy=False):
+        return self._get_linked_resource(self['previous'], lazy=lazy)
+    
+    def get_next_activity(self, lazy=False):
+        return self._get_linked_resource(self['next'], lazy=lazy)
+    
+    def get_comment_thread_async(self, lazy_parse=False, fields=None):
+        return self._get_linked_resource_async('comments', 
+                                               lazy_parse=lazy_parse,
+                                               fields=fields)
+    
+    def get_prev_activity_async(self):
+        return self._get_linked_resource_async('previous')
     
-    def get_next_activity(self):
-        return self._get_linked_resource(self._prop_dict['next'])
+    def get_next_activity_async(self):
+        return self._get_linked_resource_async('next')
     
 
 class FitnessActivitySummary(Resource):
@@ -574,11 +1428,24 @@ class FitnessActivitySummary(Resource):
                   }
     _prop_main = ('type', 'start_time',)
     
-    def __init__(self, resource, session=None):
-        super(FitnessActivitySummary, self).__init__(resource, session=session)
+    def __init__(self, resource, session=None, lazy=False, lazy_parse=False,
+                 fields=None):
+        super(FitnessActivitySummary, self).__init__(resource, session=session, lazy=lazy,
+                                                     lazy_parse=lazy_parse,
+                                                     fields=fields)
         
-    def get_activity_detail(self):
-        return self._get_linked_resource(self._prop_dict['uri'])
+    def get_activity_detail(self, lazy=False, columnar=False, streaming=False,
+                            lazy_parse=False, fields=None):
+        return self._get_linked_resource(self['uri'], lazy=lazy, 
+                                         columnar=columnar, streaming=streaming,
+                                         lazy_parse=lazy_parse, fields=fields)
+    
+    def get_activity_detail_async(self, columnar=False, streaming=False,
+                                  lazy_parse=False, fields=None):
+        return self._get_linked_resource_async('uri', columnar=columnar,
+                                               streaming=streaming,
+                                               lazy_parse=lazy_parse,
+                                               fields=fields)
     
 
 class FitnessActivityFeedItem(FeedItem):
@@ -593,15 +1460,36 @@ class FitnessActivityFeedItem(FeedItem):
                   'uri': PropResourceLink('FitnessActivity'),
                   }
     _prop_main = ('type', 'start_time',)
+    _prop_intern = ('type', 'entry_mode',)
     
-    def __init__(self, data, session=None):
-        super(FitnessActivityFeedItem, self).__init__(data, session=session)
+    def __init__(self, data, session=None, lazy_parse=False, fields=None):
+        super(FitnessActivityFeedItem, self).__init__(data, session=session, 
+                                                      lazy_parse=lazy_parse,
+                                                      fields=fields)
         
-    def get_activity_detail(self):
-        return self._get_linked_resource(self._prop_dict['uri'])
+    def get_activity_detail(self, lazy=False, columnar=False, streaming=False,
+                            lazy_parse=False, fields=None):
+        return self._get_linked_resource(self['uri'], lazy=lazy, 
+                                         columnar=columnar, streaming=streaming,
+                                         lazy_parse=lazy_parse, fields=fields)
+    
+    def get_activity_detail_async(self, columnar=False, streaming=False,
+                                  lazy_parse=False, fields=None):
+        return self._get_linked_resource_async('uri', columnar=columnar,
+                                               streaming=streaming,
+                                               lazy_parse=lazy_parse,
+                                               fields=fields)
+    
+    def get_activity_summary(self, lazy=False, lazy_parse=False, fields=None):
+        return self._get_linked_resource(self['uri'], 'FitnessActivitySummary',
+                                         lazy=lazy, lazy_parse=lazy_parse,
+                                         fields=fields)
     
-    def get_activity_summary(self):
-        return self._get_linked_resource(self._prop_dict['uri'], 'FitnessActivitySummary')
+    def get_activity_summary_async(self, lazy_parse=False, fields=None):
+        return self._get_linked_resource_async('uri', 
+                                               'FitnessActivitySummary',
+                                               lazy_parse=lazy_parse,
+                                               fields=fields)
 
 
 class FitnessActivityIter(ResourceFeedIter):
@@ -613,14 +1501,60 @@ class FitnessActivityIter(ResourceFeedIter):
                  date_min=None, date_max=None, 
                  mod_date_min=None, mod_date_max=None,
                  descending=True,
-                 session=None):
+                 page_size=None, limit=None,
+                 compact=False,
+                 workers=None, prefetch=None,
+                 session=None, lazy_parse=False, fields=None):
         super(FitnessActivityIter, self).__init__(resource,
                                                   date_min=date_min,
                                                   date_max=date_max,
                                                   mod_date_min=mod_date_min,
                                                   mod_date_max=mod_date_max,
                                                   descending=descending,
-                                                  session=session)
+                                                  page_size=page_size,
+                                                  limit=limit,
+                                                  compact=compact,
+                                                  workers=workers,
+                                                  prefetch=prefetch,
+                                                  session=session,
+                                                  lazy_parse=lazy_parse,
+                                                  fields=fields)
+        
+    def iter_activity_details(self, workers=settings.DEFAULT_WORKERS, 
+                              window=None, columnar=False, streaming=False,
+                              lazy_parse=False, fields=None):
+        """Return iterator over the detailed FitnessActivity resources of the
+        remaining feed items in feed order. The resources are retrieved 
+        concurrently.
+        
+        @param workers:   Number of threads retrieving resources; at least 1.
+        @param window:    Maximum number of resources retrieved ahead of the 
+                          consumer; at least 1. (Default: Twice the number of
+                          workers.)
+        @param columnar:  Store the streams of the resources as ColumnarArray
+                          objects if True.
+        @param streaming: Decode the resources incrementally while they are 
+                          being read if True. Implies columnar.
+        @param lazy_parse: Convert the properties of the resources on first
+                           access if True.
+        @param fields:    Sequence of the names of the properties to parse and
+                          store. All properties if None. Resource links are
+                          always included.
+        @return:          Iterator of FitnessActivity objects.
+        
+        """
+        func = functools.partial(_get_activity_detail, columnar=columnar, 
+                                 streaming=streaming, lazy_parse=lazy_parse,
+                                 fields=fields)
+        if workers < 1:
+            raise exceptions.ClientError("Number of workers must be at least 1.")
+        if window is None:
+            window = 2 * workers
+        return ordered_map(func, self, workers, window)
+
+
+def _get_activity_detail(item, **kwargs):
+    return item.get_activity_detail(**kwargs)
 
 
 class StrengthActivityFeedItem(FeedItem):
@@ -629,8 +1563,10 @@ class StrengthActivityFeedItem(FeedItem):
                   'uri': PropResourceLink('StrengthActivity')}
     _prop_main = ('start_time',)
     
-    def __init__(self, data, session=None):
-        super(StrengthActivityFeedItem, self).__init__(data, session=session)
+    def __init__(self, data, session=None, lazy_parse=False, fields=None):
+        super(StrengthActivityFeedItem, self).__init__(data, session=session, 
+                                                       lazy_parse=lazy_parse,
+                                                       fields=fields)
 
 
 class StrengthActivityIter(ResourceFeedIter):
@@ -642,14 +1578,24 @@ class StrengthActivityIter(ResourceFeedIter):
                  date_min=None, date_max=None, 
                  mod_date_min=None, mod_date_max=None,
                  descending=True,
-                 session=None):
+                 page_size=None, limit=None,
+                 compact=False,
+                 workers=None, prefetch=None,
+                 session=None, lazy_parse=False, fields=None):
         super(StrengthActivityIter, self).__init__(resource, 
                                                    date_min=date_min,
                                                    date_max=date_max,
                                                    mod_date_min=mod_date_min,
                                                    mod_date_max=mod_date_max,
-                                                   descending=descending, 
-                                                   session=session)
+                                                   descending=descending,
+                                                   page_size=page_size,
+                                                   limit=limit,
+                                                   compact=compact,
+                                                   workers=workers,
+                                                   prefetch=prefetch,
+                                                   session=session,
+                                                   lazy_parse=lazy_parse,
+                                                   fields=fields)
 
 
 class WeightMeasurementFeedItem(FeedItem):
@@ -664,8 +1610,10 @@ class WeightMeasurementFeedItem(FeedItem):
                   'bmi': float}
     _prop_main = ('timestamp',)
 
-    def __init__(self, data, session=None):
-        super(WeightMeasurementFeedItem, self).__init__(data, session=session)
+    def __init__(self, data, session=None, lazy_parse=False, fields=None):
+        super(WeightMeasurementFeedItem, self).__init__(data, session=session, 
+                                                        lazy_parse=lazy_parse,
+                                                        fields=fields)
 
 
 class WeightMeasurementIter(ResourceFeedIter):
@@ -677,14 +1625,24 @@ class WeightMeasurementIter(ResourceFeedIter):
                  date_min=None, date_max=None,
                  mod_date_min=None, mod_date_max=None,
                  descending=True,
-                 session=None):
+                 page_size=None, limit=None,
+                 compact=False,
+                 workers=None, prefetch=None,
+                 session=None, lazy_parse=False, fields=None):
         super(WeightMeasurementIter, self).__init__(resource,
                                                     date_min=date_min,
                                                     date_max=date_max,
                                                     mod_date_min=mod_date_min,
                                                     mod_date_max=mod_date_max,
                                                     descending=descending,
-                                                    session=session)
+                                                    page_size=page_size,
+                                                    limit=limit,
+                                                    compact=compact,
+                                                    workers=workers,
+                                                    prefetch=prefetch,
+                                                    session=session,
+                                                    lazy_parse=lazy_parse,
+                                                    fields=fields)
 
 
 class SleepMeasurementFeedItem(FeedItem):
@@ -703,9 +1661,12 @@ class SleepMeasurementFeedItem(FeedItem):
                   # nearest_* fields for other types are omitted for now
                   }
     _prop_main = ('timestamp',)
+    _prop_intern = ('source',)
 
-    def __init__(self, data, session=None):
-        super(SleepMeasurementFeedItem, self).__init__(data, session=session)
+    def __init__(self, data, session=None, lazy_parse=False, fields=None):
+        super(SleepMeasurementFeedItem, self).__init__(data, session=session, 
+                                                       lazy_parse=lazy_parse,
+                                                       fields=fields)
 
 
 class SleepMeasurementIter(ResourceFeedIter):
@@ -717,14 +1678,24 @@ class SleepMeasurementIter(ResourceFeedIter):
                  date_min=None, date_max=None, 
                  mod_date_min=None, mod_date_max=None,
                  descending=True,
-                 session=None):
+                 page_size=None, limit=None,
+                 compact=False,
+                 workers=None, prefetch=None,
+                 session=None, lazy_parse=False, fields=None):
         super(SleepMeasurementIter, self).__init__(resource, 
                                                     date_min=date_min,
                                                     date_max=date_max,
                                                     mod_date_min=mod_date_min,
                                                     mod_date_max=mod_date_max,
-                                                    descending=descending, 
-                                                    session=session)
+                                                    descending=descending,
+                                                    page_size=page_size,
+                                                    limit=limit,
+                                                    compact=compact,
+                                                    workers=workers,
+                                                    prefetch=prefetch,
+                                                    session=session,
+                                                    lazy_parse=lazy_parse,
+                                                    fields=fields)
 
 
 class CommentThread(Resource):
@@ -736,5 +1707,8 @@ class CommentThread(Resource):
                   }
     _prop_main = ('uri',)
     
-    def __init__(self, resource, session=None):
-        super(CommentThread, self).__init__(resource, session=session)
+    def __init__(self, resource, session=None, lazy=False, lazy_parse=False,
+                 fields=None):
+        super(CommentThread, self).__init__(resource, session=session, 
+                                            lazy=lazy, lazy_parse=lazy_parse,
+                                            fields=fields)
@@ -7,9 +7,22 @@ This module implements sessions for making REST requests to the Health Graph API
 
 """
 
+import time
+import cookielib
+import threading
+from collections import OrderedDict
 import requests
+from requests.adapters import HTTPAdapter
 import exceptions
 import settings
+import content_types
+from concurrency import WorkerPool, SingleFlight
+from cache import ResponseCache
+from streaming import decode_stream
+from ratelimit import RateLimits, RetryPolicy
+from metrics import get_metrics
+from profiling import phase
+from jsondecode import get_decoder
 
 
 __author__ = "Ali Onur Uyar"
@@ -19,16 +32,105 @@ __license__ = "GPL"
 __version__ = "0.3.0"
 __email__ = "aouyar at gmail.com"
 __status__ = "Development"
+
+
+def create_transport(pool_connections=settings.DEFAULT_POOL_CONNECTIONS,
+                     pool_maxsize=settings.DEFAULT_POOL_MAXSIZE):
+    """Create HTTP transport with a pool of persistent (keep-alive) connections.
+
+    @param pool_connections: Number of per host connection pools to cache.
+    @param pool_maxsize:     Maximum number of connections kept per host.
+    @return:                 Transport (requests.Session) object.
+
+    """
+    transport = requests.Session()
+    # The transport may be shared by sessions of different users; never
+    # carry cookies from one request to the next.
+    transport.cookies.set_policy(cookielib.DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize)
+    transport.mount('https://', adapter)
+    transport.mount('http://', adapter)
+    return transport
     
     
 class Session(object):
     
-    def __init__(self, access_token):
+    def __init__(self, access_token, transport=None, cache=None, store=None,
+                 rate_limits=None, retry_policy=None, decoder=None, 
+                 compress=True, single_flight=True):
+        """Initialize session.
+        
+        @param access_token:  Access Token for querying Health Graph API.
+        @param transport:     Transport used for HTTP requests. The connection
+                              pool shared by default is used if None.
+        @param cache:         ResponseCache object for caching the decoded 
+                              data of GET requests. Caching is disabled if None.
+        @param store:         SQLiteStore object. Resources are served from the
+                              store while fresh and stored when retrieved, 
+                              keyed by access token and URI, and removed when
+                              updated or deleted; the feeds synchronized with
+                              the store are iterated from the store while 
+                              fresh. Disabled if None.
+        @param rate_limits:   RateLimits object throttling the requests of the
+                              session. The rate limits shared by default are 
+                              used if None.
+        @param retry_policy:  RetryPolicy object for throttled and failed 
+                              requests. The default policy is used if None.
+        @param decoder:       JSON decoder backend name (ujson, simplejson or 
+                              json) or decoder function. The default decoder
+                              (see jsondecode.init_decoder) is used if None.
+        @param compress:      Request gzip or deflate compressed responses 
+                              (settings.ACCEPT_ENCODING) if True, uncompressed
+                              responses otherwise.
+        @param single_flight: Share the requests of get_data with concurrent
+                              identical requests if True. (See get_data.)
+        
+        """
         self._access_token = access_token
+        if transport is not None:
+            self._transport = transport
+        else:
+            self._transport = get_transport()
+        self._cache = cache
+        self._store = store
+        if store is not None:
+            self._store_owner = store.owner_key(access_token)
+        else:
+            self._store_owner = None
+        if rate_limits is not None:
+            self._rate_limits = rate_limits
+        else:
+            self._rate_limits = get_rate_limits()
+        if retry_policy is not None:
+            self._retry_policy = retry_policy
+        else:
+            self._retry_policy = RetryPolicy()
+        self._decoder = get_decoder(decoder)
+        if compress:
+            self._accept_encoding = settings.ACCEPT_ENCODING
+        else:
+            self._accept_encoding = 'identity'
+        self._single_flight = single_flight
+            
+    @property
+    def transport(self):
+        return self._transport
+    
+    @property
+    def cache(self):
+        return self._cache
+    
+    @property
+    def store(self):
+        return self._store
         
     def request(self, request_type, resource, content_type=None, 
-                params=None, data=None):
-        headers = {'Authorization': "Bearer %s" % self._access_token,}
+                params=None, data=None, headers=None, stream=False):
+        headers = dict(headers or {})
+        headers['Authorization'] = "Bearer %s" % self._access_token
+        if request_type == 'GET':
+            headers.setdefault('Accept-Encoding', self._accept_encoding)
         content_header = None
         if content_type is not None:
             if request_type == 'GET':
@@ -41,13 +143,186 @@ class Session(object):
                 headers[content_header] = ('application/vnd.com.runkeeper.%s+json'
                                            % content_type)
         url = settings.API_URL + resource
-        req = requests.request(request_type, url, headers=headers, 
-                               params=params, data=data)
+        retry_policy = self._retry_policy
+        metrics = get_metrics()
+        attempt = 0
+        while True:
+            self._rate_limits.acquire(self._access_token)
+            start = time.time()
+            try:
+                with phase('network', content_type):
+                    req = self._transport.request(request_type, url, 
+                                                  headers=headers, 
+                                                  params=params, data=data, 
+                                                  stream=stream)
+            except requests.ConnectionError:
+                if metrics.enabled:
+                    metrics.record_request(content_type, request_type, None,
+                                           time.time() - start,
+                                           _body_size(data), 0, 0)
+                if not retry_policy.should_retry(request_type, attempt):
+                    raise
+                delay = retry_policy.get_delay(attempt)
+            else:
+                status = req.status_code
+                if metrics.enabled:
+                    if stream:
+                        # The body has not been read yet.
+                        received = wire = int(req.headers.get('Content-Length') 
+                                              or 0)
+                    else:
+                        received = len(req.content)
+                        wire = _wire_size(req)
+                    metrics.record_request(content_type, request_type, status,
+                                           time.time() - start, 
+                                           _body_size(data), received, wire)
+                retry_after = req.headers.get('Retry-After')
+                if not retry_policy.should_retry(request_type, attempt, status,
+                                                 retry_after):
+                    break
+                delay = retry_policy.get_delay(attempt, retry_after)
+                if status == 429:
+                    self._rate_limits.defer(self._access_token, delay)
+                req.close()
+            time.sleep(delay)
+            attempt += 1
+        if self._cache is not None and request_type in ('POST', 'PUT', 'DELETE'):
+            self._cache.invalidate(resource)
+        if self._store is not None and request_type in ('POST', 'PUT', 'DELETE'):
+            self._store.discard_resource(self._store_owner, resource,
+                                         deleted=(request_type == 'DELETE'))
         return req
     
     def get(self, resource, content_type=None, params=None):
         return self.request('GET', resource, content_type, params=params)
     
+    def get_data(self, resource, content_type=None, params=None):
+        """Retrieve resource and return decoded JSON data.
+        
+        If the session has a cache, fresh cached data is returned without 
+        accessing the API and stale cached data is revalidated using a 
+        conditional GET request. If the session has a store, resources 
+        requested without query string or parameters are served from and 
+        saved to the store; feeds and feed pages never are.
+        
+        Unless disabled for the session, concurrent identical requests (same
+        access token, resource, content type and parameters) from sessions 
+        with the same decoder, cache and store share a single request and its
+        decoded data, which must be treated as read-only.
+        
+        @param resource:     Resource URI.
+        @param content_type: Content Type of resource.
+        @param params:       Dictionary of query parameters.
+        @return:             Decoded JSON data.
+        
+        """
+        if not self._single_flight:
+            return self._fetch_data(resource, content_type, params)
+        key = (ResponseCache.make_key(self._access_token, resource, 
+                                      content_type, params),
+               self._decoder, self._cache, self._store)
+        return _single_flight.do(key, self._fetch_data, resource, content_type,
+                                 params)
+    
+    def _fetch_data(self, resource, content_type=None, params=None):
+        store = self._store
+        if (store is None or params or '?' in resource 
+            or content_type in content_types.FEEDS):
+            return self._get_data(resource, content_type, params)
+        data = store.get_resource(self._store_owner, resource)
+        if data is None:
+            data = self._get_data(resource, content_type, params)
+            if isinstance(data, dict):
+                store.store_resource(self._store_owner, resource, data)
+        return data
+        
+    def _get_data(self, resource, content_type=None, params=None):
+        cache = self._cache
+        if cache is None:
+            resp = self.get(resource, content_type, params)
+            return self._decode_response(resp, content_type)
+        key = cache.make_key(self._access_token, resource, content_type, params)
+        entry = cache.lookup(key)
+        headers = {}
+        if entry is not None:
+            if cache.is_fresh(entry):
+                cache.hit()
+                return entry.data
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+        resp = self.request('GET', resource, content_type, params=params, 
+                            headers=headers)
+        if resp.status_code == 304 and entry is not None:
+            cache.revalidate(entry)
+            return entry.data
+        try:
+            data = self._decode_response(resp, content_type)
+        except exceptions.Error:
+            cache.miss()
+            raise
+        if resp.status_code == 200:
+            cache.store(key, data, resp.headers.get('ETag'), 
+                        resp.headers.get('Last-Modified'))
+        else:
+            cache.miss()
+        return data
+    
+    def _check_response(self, resp):
+        if resp.status_code >= 400:
+            raise exceptions.RemoteError("Request for %s failed with HTTP status"
+                                         " %d %s." % (resp.url, resp.status_code,
+                                                      resp.reason))
+        
+    def _decode_response(self, resp, content_type=None):
+        self._check_response(resp)
+        start = time.time()
+        try:
+            with phase('decode', content_type):
+                data = self._decoder(resp.content)
+        except ValueError, e:
+            raise exceptions.ParseError("Invalid JSON response for %s: %s"
+                                        % (resp.url, e))
+        metrics = get_metrics()
+        if metrics.enabled:
+            metrics.record_decode(content_type, time.time() - start)
+        return data
+    
+    def get_data_stream(self, resource, content_type=None, params=None,
+                        stream_factories=None):
+        """Retrieve resource and decode JSON data incrementally while the 
+        response body is being read.
+        
+        The response is not stored in the cache of the session. 
+        
+        @param resource:         Resource URI.
+        @param content_type:     Content Type of resource.
+        @param params:           Dictionary of query parameters.
+        @param stream_factories: Dictionary mapping the names of members that
+                                 are arrays of points to callables returning 
+                                 an empty container for the points 
+                                 (e.g. ColumnarArray subclasses).
+        @return:                 Decoded JSON data.
+        
+        """
+        resp = self.request('GET', resource, content_type, params=params, 
+                            stream=True)
+        try:
+            self._check_response(resp)
+            start = time.time()
+            with phase('decode', content_type):
+                data = decode_stream(
+                            resp.iter_content(settings.STREAM_CHUNK_SIZE),
+                            stream_factories)
+        finally:
+            resp.close()
+        metrics = get_metrics()
+        if metrics.enabled:
+            # Includes the time for reading the response body.
+            metrics.record_decode(content_type, time.time() - start)
+        return data
+    
     def post(self, resource, content_type=None, data=None):
         return self.request('POST', resource, content_type, data=data)
         
@@ -61,17 +336,216 @@ class Session(object):
         return self.request('HEAD', resource, content_type, params=params)
 
 
+def _body_size(data):
+    if isinstance(data, basestring):
+        return len(data)
+    else:
+        return 0
+
+def _wire_size(resp):
+    """Return size of response body as transferred, before decompression."""
+    try:
+        return resp.raw.tell()
+    except AttributeError:
+        return len(resp.content)
+
+
+class AsyncSession(Session):
+    """Session for making requests without blocking the caller.
+    
+    Requests are executed by a pool of worker threads, which may be shared by
+    the sessions of many users. The asynchronous methods of resources return 
+    Future objects when the resources are created with an AsyncSession.
+    
+    """
+    
+    def __init__(self, access_token, transport=None, cache=None, store=None,
+                 rate_limits=None, retry_policy=None, pool=None, decoder=None,
+                 compress=True, single_flight=True):
+        """Initialize session.
+        
+        @param access_token:  Access Token for querying Health Graph API.
+        @param transport:     Transport used for HTTP requests. The connection
+                              pool shared by default is used if None.
+        @param cache:         ResponseCache object for caching the decoded 
+                              data of GET requests. Caching is disabled if None.
+        @param store:         SQLiteStore object for serving resources and 
+                              synchronized feeds locally. Disabled if None.
+        @param rate_limits:   RateLimits object throttling the requests of the
+                              session. The rate limits shared by default are 
+                              used if None.
+        @param retry_policy:  RetryPolicy object for throttled and failed 
+                              requests. The default policy is used if None.
+        @param pool:          WorkerPool executing the requests. The worker pool
+                              shared by default at the time of each call is 
+                              used if None. (See init_worker_pool.)
+        @param decoder:       JSON decoder backend name or decoder function. 
+                              The default decoder is used if None.
+        @param compress:      Request compressed responses if True.
+        @param single_flight: Share the requests of get_data with concurrent
+                              identical requests if True.
+        
+        """
+        super(AsyncSession, self).__init__(access_token, transport=transport,
+                                           cache=cache, store=store,
+                                           rate_limits=rate_limits,
+                                           retry_policy=retry_policy,
+                                           decoder=decoder, compress=compress,
+                                           single_flight=single_flight)
+        self._pool = pool
+            
+    def submit(self, func, *args, **kwargs):
+        """Schedule call of func with the given arguments on the worker pool.
+        
+        @return: Future object for the result of the call.
+        
+        """
+        pool = self._pool
+        if pool is None:
+            pool = get_worker_pool()
+        return pool.submit(func, *args, **kwargs)
+    
+    def get_data_async(self, resource, content_type=None, params=None):
+        return self.submit(self.get_data, resource, content_type, params)
+        
+
 class NullSession(Session):
 
     def __init__(self):
         self._access_token = None
+        self._transport = None
+        self._cache = None
+        self._store = None
+        self._store_owner = None
+        self._rate_limits = None
+        self._retry_policy = None
+        self._decoder = None
+        self._accept_encoding = None
+        self._single_flight = False
         
     def request(self, request_type, resource, content_type=None, 
-            params=None, data=None):
+            params=None, data=None, headers=None, stream=False):
         raise exceptions.NoSessionError()
 
 
+class SessionPool(object):
+    """Thread-safe registry of sessions keyed by access token.
+    
+    All sessions of the pool share the transport (connection pool), the cache
+    and the rate limits of the pool; the cache and the rate limits keep 
+    separate entries and token buckets for each access token. The store of 
+    each session is obtained from the store factory of the pool. Sessions 
+    which have not been used for idle_timeout seconds are evicted, as are the
+    least recently used sessions when the pool exceeds max_sessions; the 
+    state of the rate limits (e.g. requests deferred after a 429 response) 
+    outlives the sessions.
+    
+    """
+    
+    def __init__(self, transport=None, cache=None, store_factory=None, 
+                 rate_limits=None, retry_policy=None, 
+                 idle_timeout=settings.SESSION_IDLE_TIMEOUT,
+                 max_sessions=settings.SESSION_POOL_MAX,
+                 session_cls=Session):
+        """Initialize session pool.
+        
+        @param transport:     Transport shared by the sessions. The connection
+                              pool shared by default is used if None.
+        @param cache:         ResponseCache object shared by the sessions. 
+                              Caching is disabled if None.
+        @param store_factory: Function called with the access token of each 
+                              new session and returning its SQLiteStore object
+                              or None. Disabled if None.
+        @param rate_limits:   RateLimits object shared by the sessions. The 
+                              rate limits shared by default are used if None.
+        @param retry_policy:  RetryPolicy object shared by the sessions. The
+                              default policy is used if None.
+        @param idle_timeout:  Time in seconds after which unused sessions are
+                              evicted.
+        @param max_sessions:  Maximum number of sessions kept.
+        @param session_cls:   Session class (Session or AsyncSession).
+        
+        """
+        self._transport = transport or get_transport()
+        self._cache = cache
+        self._store_factory = store_factory
+        self._rate_limits = rate_limits or get_rate_limits()
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._idle_timeout = idle_timeout
+        self._max_sessions = max_sessions
+        self._session_cls = session_cls
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        
+    def get(self, access_token):
+        """Return the session for access_token, creating it if needed.
+        
+        @param access_token: Access Token for querying Health Graph API.
+        @return:             Session object.
+        
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.pop(access_token, None)
+            if entry is None:
+                if self._store_factory is not None:
+                    store = self._store_factory(access_token)
+                else:
+                    store = None
+                session = self._session_cls(access_token, 
+                                            transport=self._transport,
+                                            cache=self._cache,
+                                            store=store,
+                                            rate_limits=self._rate_limits,
+                                            retry_policy=self._retry_policy)
+            else:
+                session = entry[0]
+            self._sessions[access_token] = (session, now)
+            self._evict(now)
+        return session
+    
+    def discard(self, access_token):
+        """Remove the session for access_token (e.g. on logout)."""
+        with self._lock:
+            self._sessions.pop(access_token, None)
+            
+    def evict_idle(self):
+        """Remove idle sessions.
+        
+        @return: Number of sessions removed.
+        
+        """
+        with self._lock:
+            evicted = self._evict(time.time())
+        return len(evicted)
+    
+    def _evict(self, now):
+        evicted = []
+        for access_token, (_, last_used) in self._sessions.iteritems():
+            if (now - last_used < self._idle_timeout 
+                and len(self._sessions) - len(evicted) <= self._max_sessions):
+                break
+            evicted.append(access_token)
+        for access_token in evicted:
+            del self._sessions[access_token]
+        return evicted
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+    
+    def __contains__(self, access_token):
+        with self._lock:
+            return access_token in self._sessions
+
+
 _default_session = NullSession()
+_default_transport = None
+_transport_lock = threading.Lock()
+_default_pool = None
+_pool_lock = threading.Lock()
+_default_rate_limits = RateLimits()
+_single_flight = SingleFlight()
 
 def init_session(access_token):
     global _default_session
@@ -79,4 +553,61 @@ def init_session(access_token):
     
 def get_session():
     return _default_session
+
+def init_transport(pool_connections=settings.DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize=settings.DEFAULT_POOL_MAXSIZE):
+    global _default_transport
+    with _transport_lock:
+        _default_transport = create_transport(pool_connections, pool_maxsize)
+
+def get_transport():
+    global _default_transport
+    with _transport_lock:
+        if _default_transport is None:
+            _default_transport = create_transport()
+        return _default_transport
+
+def get_single_flight():
+    return _single_flight
+
+def init_rate_limits(app_rate=None, app_burst=None, 
+                     token_rate=None, token_burst=None):
+    """Set the rate limits shared by default by all sessions.
+    
+    @param app_rate:    Maximum requests per second for all access tokens.
+                        No limit if None.
+    @param app_burst:   Maximum burst of requests for all access tokens.
+    @param token_rate:  Maximum requests per second for each access token.
+                        No limit if None.
+    @param token_burst: Maximum burst of requests for each access token.
+    
+    """
+    global _default_rate_limits
+    _default_rate_limits = RateLimits(app_rate, app_burst, 
+                                      token_rate, token_burst)
+    
+def get_rate_limits():
+    return _default_rate_limits
+
+def init_worker_pool(workers=settings.DEFAULT_WORKERS):
+    """Replace the worker pool shared by default by the asynchronous sessions.
+    The previous pool is shut down; the calls it has not started yet are 
+    cancelled.
+    
+    @param workers: Number of worker threads.
+    
+    """
+    global _default_pool
+    with _pool_lock:
+        old_pool = _default_pool
+        _default_pool = WorkerPool(workers)
+    if old_pool is not None:
+        old_pool.shutdown()
+        
+def get_worker_pool():
+    global _default_pool
+    with _pool_lock:
+        if _default_pool is None:
+            _default_pool = WorkerPool(settings.DEFAULT_WORKERS)
+        return _default_pool
     
\ No newline at end of file
@@ -30,7 +30,29 @@ LOGIN_BUTTON_CAPTION_COLORS = ('white', 'black',)
 API_URL = 'https://api.runkeeper.com'
 USER_RESOURCE = '/user'
 DEFAULT_PAGE_SIZE = 25
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+DEFAULT_WORKERS = 10
+CACHE_MAX_ENTRIES = 1000
+CACHE_TTL = 300
+STREAM_CHUNK_SIZE = 65536
+SYNC_FEEDS = ('fitness_activities', 'strength_training_activities', 
+              'weight', 'sleep',)
+SYNC_OVERLAP_DAYS = 1
+STORE_MAX_AGE = 3600
+RETRY_MAX = 3
+RETRY_BACKOFF = 0.5
+RETRY_BACKOFF_MAX = 30
+RETRY_STATUSES = (429, 500, 502, 503, 504,)
+RATE_LIMITS_PRUNE_SIZE = 1000
+SESSION_IDLE_TIMEOUT = 900
+SESSION_POOL_MAX = 10000
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 
+                           1.0, 2.5, 5.0, 10.0,)
+JSON_DECODERS = ('ujson', 'simplejson', 'json',)
+ACCEPT_ENCODING = 'gzip, deflate'
 
 NUM2MONTH = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct',
              'Nov','Dec',)
-MONTH2NUM = dict(zip(NUM2MONTH,range(1,13)))
\ No newline at end of file
+MONTH2NUM = dict(zip(NUM2MONTH,range(1,13)))
+NUM2WEEKDAY = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun',)
\ No newline at end of file
@@ -0,0 +1,307 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the local SQLite replica of the resources and feed items
+of users.
+
+"""
+
+import time
+import json
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import settings
+from parser import parse_datetime
+from sync import SyncStore
+from upload import UploadLog
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+_schema = """
+CREATE TABLE IF NOT EXISTS resources (
+    owner TEXT NOT NULL,
+    uri TEXT NOT NULL,
+    user_id INTEGER,
+    type TEXT,
+    start_time TEXT,
+    data TEXT NOT NULL,
+    stored REAL NOT NULL,
+    PRIMARY KEY (owner, uri)
+);
+CREATE INDEX IF NOT EXISTS resources_user_id ON resources (user_id);
+CREATE INDEX IF NOT EXISTS resources_start_time ON resources (start_time);
+CREATE INDEX IF NOT EXISTS resources_type ON resources (type);
+CREATE TABLE IF NOT EXISTS feed_items (
+    uri TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    feed TEXT NOT NULL,
+    type TEXT,
+    start_time TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS feed_items_start_time
+    ON feed_items (user_id, feed, start_time);
+CREATE INDEX IF NOT EXISTS feed_items_type
+    ON feed_items (user_id, feed, type, start_time);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    user_id INTEGER NOT NULL,
+    feed TEXT NOT NULL,
+    checkpoint REAL NOT NULL,
+    PRIMARY KEY (user_id, feed)
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    key TEXT PRIMARY KEY,
+    uri TEXT,
+    uploaded REAL NOT NULL
+);
+"""
+
+
+def _index_values(data):
+    """Return the type and start time (ISO 8601) of resource or feed item."""
+    start_time = parse_datetime(data.get('start_time') or data.get('timestamp'))
+    if start_time is not None:
+        start_time = start_time.isoformat()
+    return data.get('type'), start_time
+
+def _date_bound(val, days=0):
+    if isinstance(val, basestring):
+        val = datetime.strptime(val, '%Y-%m-%d')
+    if isinstance(val, datetime):
+        val = val.date()
+    return (val + timedelta(days=days)).isoformat()
+
+
+class SQLiteStore(SyncStore, UploadLog):
+    """Local replica of resources and feed items in a SQLite database.
+
+    Fitness Activities and other resources are stored keyed by owner and URI
+    as they are retrieved by sessions using the store; the owner identifies
+    the access token of the session (see owner_key), since resources like
+    /user have the same URI for all users. Feed items are stored by
+    SyncEngine. Feed items are indexed by user, feed, start time (timestamp
+    for measurements) and type for date range and type queries. The store
+    also serves as the upload log of BulkUploader.
+
+    """
+
+    def __init__(self, path=':memory:', max_age=settings.STORE_MAX_AGE):
+        """Initialize store.
+
+        @param path:    Path of database file.
+        @param max_age: Time in seconds resources and synchronized feeds are
+                        served from the store instead of the API.
+
+        """
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_schema)
+        self._lock = threading.Lock()
+        self._max_age = max_age
+        self._reserved = set()
+
+    @property
+    def max_age(self):
+        return self._max_age
+
+    @staticmethod
+    def owner_key(access_token):
+        """Return the key identifying the resources retrieved with access_token
+        in the store, without storing the token itself.
+
+        """
+        return hashlib.sha1(access_token).hexdigest()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def store_resource(self, owner, uri, data):
+        """Insert or replace resource.
+
+        @param owner: Owner key of resource (see owner_key).
+        @param uri:   Resource URI.
+        @param data:  Decoded JSON data of resource.
+
+        """
+        res_type, start_time = _index_values(data)
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO resources "
+                                   "(owner, uri, user_id, type, start_time, "
+                                   "data, stored) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   (owner, uri, data.get('userID'), res_type,
+                                    start_time, json.dumps(data), time.time()))
+
+    def get_resource(self, owner, uri, max_age=None):
+        """Return decoded JSON data of resource if it was stored no more than
+        max_age seconds ago.
+
+        @param owner:   Owner key of resource (see owner_key).
+        @param uri:     Resource URI.
+        @param max_age: Maximum age in seconds. The max_age of the store is
+                        used if None.
+        @return:        Dictionary or None.
+
+        """
+        if max_age is None:
+            max_age = self._max_age
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM resources "
+                                     "WHERE owner = ? AND uri = ? "
+                                     "AND stored >= ?",
+                                     (owner, uri,
+                                      time.time() - max_age)).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+        else:
+            return None
+
+    def discard_resource(self, owner, uri, deleted=False):
+        """Remove resource and the feed containing it (e.g. /fitnessActivities
+        for /fitnessActivities/123) following a creation, update or deletion
+        through the API. The query string of uri is ignored.
+
+        @param owner:   Owner key of resource (see owner_key).
+        @param uri:     Resource URI.
+        @param deleted: Also remove the feed item for uri if True.
+
+        """
+        path = uri.split('?', 1)[0].rstrip('/')
+        parent = path.rsplit('/', 1)[0]
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM resources "
+                                   "WHERE owner = ? AND uri IN (?, ?)", 
+                                   (owner, path, parent))
+                if deleted:
+                    self._conn.execute("DELETE FROM feed_items WHERE uri = ?",
+                                       (path,))
+
+    def get_checkpoint(self, user_id, feed):
+        with self._lock:
+            row = self._conn.execute("SELECT checkpoint FROM checkpoints "
+                                     "WHERE user_id = ? AND feed = ?",
+                                     (user_id, feed)).fetchone()
+        if row is not None:
+            return datetime.fromtimestamp(row[0])
+        else:
+            return None
+
+    def is_fresh(self, user_id, feed):
+        """Return True if feed was synchronized no more than max_age seconds
+        ago.
+
+        """
+        checkpoint = self.get_checkpoint(user_id, feed)
+        return (checkpoint is not None and datetime.now() - checkpoint
+                < timedelta(seconds=self._max_age))
+
+    def commit(self, user_id, feed, items, checkpoint, replace=False):
+        rows = []
+        for item in items:
+            item_type, start_time = _index_values(item)
+            rows.append((item['uri'], user_id, feed, item_type, start_time,
+                         json.dumps(item)))
+        with self._lock:
+            with self._conn:
+                if replace:
+                    self._conn.execute("DELETE FROM feed_items "
+                                       "WHERE user_id = ? AND feed = ?",
+                                       (user_id, feed))
+                self._conn.executemany("INSERT OR REPLACE INTO feed_items "
+                                       "(uri, user_id, feed, type, start_time, "
+                                       "data) VALUES (?, ?, ?, ?, ?, ?)", rows)
+                self._conn.execute("INSERT OR REPLACE INTO checkpoints "
+                                   "(user_id, feed, checkpoint) "
+                                   "VALUES (?, ?, ?)",
+                                   (user_id, feed,
+                                    time.mktime(checkpoint.timetuple())
+                                    + checkpoint.microsecond / 1e6))
+
+    def get_items(self, user_id, feed):
+        return self.query_items(user_id, feed)
+
+    def reserve(self, key):
+        """Reserve key for an upload. Reservations are kept in memory and are
+        only atomic within the process.
+
+        """
+        with self._lock:
+            if key in self._reserved:
+                return False
+            row = self._conn.execute("SELECT 1 FROM uploads WHERE key = ?",
+                                     (key,)).fetchone()
+            if row is not None:
+                return False
+            self._reserved.add(key)
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._reserved.discard(key)
+
+    def get_uploaded(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT uri FROM uploads WHERE key = ?",
+                                     (key,)).fetchone()
+        if row is not None:
+            return row[0] or ''
+        else:
+            return None
+
+    def mark_uploaded(self, key, uri):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO uploads "
+                                   "(key, uri, uploaded) VALUES (?, ?, ?)",
+                                   (key, uri, time.time()))
+            self._reserved.discard(key)
+
+    def query_items(self, user_id, feed, date_min=None, date_max=None,
+                    item_type=None, descending=True, limit=None):
+        """Return the decoded JSON data of the stored items of feed matching
+        the filters, ordered by start time (timestamp for measurements).
+
+        @param user_id:    User ID.
+        @param feed:       Feed name (e.g. fitness_activities).
+        @param date_min:   Only items with date no earlier than date_min.
+        @param date_max:   Only items with date no later than date_max.
+        @param item_type:  Only items of type (e.g. Running).
+        @param descending: Order from the newest to the oldest item if True.
+        @param limit:      Maximum number of items.
+        @return:           List of dictionaries.
+
+        """
+        query = "SELECT data FROM feed_items WHERE user_id = ? AND feed = ?"
+        args = [user_id, feed]
+        if date_min is not None:
+            query += " AND start_time >= ?"
+            args.append(_date_bound(date_min))
+        if date_max is not None:
+            query += " AND start_time < ?"
+            args.append(_date_bound(date_max, days=1))
+        if item_type is not None:
+            query += " AND type = ?"
+            args.append(item_type)
+        if descending:
+            query += " ORDER BY start_time DESC"
+        else:
+            query += " ORDER BY start_time ASC"
+        if limit is not None:
+            query += " LIMIT ?"
+            args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [json.loads(row[0]) for row in rows]
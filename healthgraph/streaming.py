@@ -0,0 +1,267 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the incremental decoding of JSON responses of the
+Health Graph API.
+
+"""
+
+import re
+import json
+import codecs
+from json.decoder import scanstring
+import exceptions
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+_ws_re = re.compile(r'[ \t\n\r]*')
+_number_re = re.compile(r'-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?')
+_constants = {'null': None, 'true': True, 'false': False,}
+# Member of a point with a scalar value and no escape sequences, followed by
+# the separator; the common case decoded without the generic scanners.
+_member_re = re.compile(r'[ \t\n\r]*"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*'
+                        r'(?:(-?(?:0|[1-9]\d*)(\.\d+)?([eE][-+]?\d+)?)'
+                        r'|"([^"\\]*)"|(null|true|false))[ \t\n\r]*([,}])')
+_next_point_re = re.compile(r'[ \t\n\r]*,[ \t\n\r]*\{')
+# Characters which may continue a number cut short at the end of a chunk.
+_number_chars = frozenset('0123456789.eE+-')
+
+# Buffered text before the current position is discarded once it grows beyond
+# this size.
+_COMPACT_SIZE = 65536
+
+
+class _NeedData(Exception):
+    """Raised when the buffer ends before the current token."""
+    pass
+
+
+class StreamDecoder(object):
+    """Incremental decoder for a JSON object read from a sequence of chunks.
+
+    The members of the object are decoded one at a time as the chunks arrive.
+    The elements of the arrays in stream_factories are appended one point at
+    a time to the container created by the factory (normally a ColumnarArray),
+    so neither the complete response body nor a dictionary for each point is
+    kept in memory. The elements of stream arrays must be flat JSON objects.
+
+    """
+
+    def __init__(self, chunks, stream_factories=None):
+        """Initialize decoder.
+
+        @param chunks:           Iterable of byte strings with the UTF-8
+                                 encoded JSON text.
+        @param stream_factories: Dictionary mapping the names of members that
+                                 are arrays of points to callables returning
+                                 an empty container with an append method.
+
+        """
+        self._chunks = iter(chunks)
+        self._stream_factories = stream_factories or {}
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buf = u''
+        self._pos = 0
+        self._eof = False
+
+    def _read(self):
+        """Append the next chunk to the buffer. Returns False at the end of
+        the input.
+
+        """
+        if self._eof:
+            return False
+        if self._pos > _COMPACT_SIZE:
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        try:
+            chunk = self._chunks.next()
+        except StopIteration:
+            self._eof = True
+            self._buf += self._utf8.decode('', True)
+        else:
+            self._buf += self._utf8.decode(chunk)
+        return True
+
+    def _parse(self, func):
+        """Call func(buf, pos), which returns (value, end), reading more input
+        until the token is complete. Tokens ending at the end of the buffer
+        are parsed again once more input is available, as they may have been
+        cut short (e.g. numbers).
+
+        """
+        while True:
+            try:
+                value, end = func(self._buf, self._pos)
+            except (_NeedData, ValueError, IndexError):
+                if not self._read():
+                    raise
+            else:
+                if end < len(self._buf) or not self._read():
+                    self._pos = end
+                    return value
+
+    def _skip_ws(self):
+        while True:
+            self._pos = _ws_re.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._read():
+                return
+
+    def _expect(self, chars):
+        """Consume the next non-whitespace character, which must be one of
+        chars, and return it.
+
+        """
+        self._skip_ws()
+        if self._pos >= len(self._buf):
+            raise ValueError("Unexpected end of JSON data.")
+        char = self._buf[self._pos]
+        if char not in chars:
+            raise ValueError("Expecting one of %r at position %d, found %r."
+                             % (chars, self._pos, char))
+        self._pos += 1
+        return char
+
+    def _peek(self):
+        self._skip_ws()
+        if self._pos >= len(self._buf):
+            raise ValueError("Unexpected end of JSON data.")
+        return self._buf[self._pos]
+
+    def _scan_string(self, buf, pos):
+        if pos >= len(buf):
+            raise _NeedData()
+        if buf[pos] != '"':
+            raise exceptions.ParseError("Invalid JSON response: "
+                                        "Expecting string at position %d." % pos)
+        return scanstring(buf, pos + 1)
+
+    def _scan_value(self, buf, pos):
+        value, end = self._decoder.raw_decode(buf, pos)
+        if end < len(buf) and buf[end] in _number_chars:
+            raise _NeedData()
+        return value, end
+
+    def _scan_scalar(self, buf, pos):
+        if pos >= len(buf):
+            raise _NeedData()
+        char = buf[pos]
+        if char == '"':
+            return scanstring(buf, pos + 1)
+        mobj = _number_re.match(buf, pos)
+        if mobj is not None:
+            if mobj.end() < len(buf) and buf[mobj.end()] in _number_chars:
+                raise _NeedData()
+            if mobj.group(1) or mobj.group(2):
+                return float(mobj.group()), mobj.end()
+            else:
+                return int(mobj.group()), mobj.end()
+        for word, value in _constants.iteritems():
+            if buf.startswith(word, pos):
+                return value, pos + len(word)
+        # Nested values are not expected in points; decode them generically.
+        return self._decoder.raw_decode(buf, pos)
+
+    def _decode_stream(self, container):
+        """Decode array of flat objects, appending each one to container."""
+        point = {}
+        member_match = _member_re.match
+        next_match = _next_point_re.match
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return container
+        self._expect('{')
+        while True:
+            mobj = member_match(self._buf, self._pos)
+            if mobj is not None:
+                key, num, frac, exp, text, const, sep = mobj.groups()
+                if num is not None:
+                    if frac or exp:
+                        point[key] = float(num)
+                    else:
+                        point[key] = int(num)
+                elif text is not None:
+                    point[key] = text
+                else:
+                    point[key] = _constants[const]
+                self._pos = mobj.end()
+            elif not point and self._peek() == '}':
+                self._pos += 1
+                sep = '}'
+            else:
+                # Member cut short at the end of the buffer or containing
+                # escape sequences.
+                self._skip_ws()
+                key = self._parse(self._scan_string)
+                self._expect(':')
+                self._skip_ws()
+                point[key] = self._parse(self._scan_scalar)
+                sep = self._expect(',}')
+            if sep == '}':
+                container.append(point)
+                # The same dictionary is reused for all points.
+                point.clear()
+                mobj = next_match(self._buf, self._pos)
+                if mobj is not None:
+                    self._pos = mobj.end()
+                elif self._expect(',]') == ']':
+                    return container
+                else:
+                    self._expect('{')
+
+    def decode(self):
+        """Decode the input.
+
+        @return: Dictionary of members of the JSON object.
+
+        """
+        try:
+            result = {}
+            self._expect('{')
+            if self._peek() == '}':
+                self._pos += 1
+            else:
+                while True:
+                    self._skip_ws()
+                    key = self._parse(self._scan_string)
+                    self._expect(':')
+                    factory = self._stream_factories.get(key)
+                    if factory is not None and self._peek() == '[':
+                        result[key] = self._decode_stream(factory())
+                    else:
+                        self._skip_ws()
+                        result[key] = self._parse(self._scan_value)
+                    if self._expect(',}') == '}':
+                        break
+            self._skip_ws()
+            if self._pos < len(self._buf):
+                raise ValueError("Extra data at position %d." % self._pos)
+        except (_NeedData, IndexError, ValueError), e:
+            raise exceptions.ParseError("Invalid JSON response: %s" % e)
+        return result
+
+
+def decode_stream(chunks, stream_factories=None):
+    """Decode JSON object incrementally from a sequence of chunks.
+
+    @param chunks:           Iterable of byte strings with the UTF-8 encoded
+                             JSON text.
+    @param stream_factories: Dictionary mapping the names of members that are
+                             arrays of points to callables returning an empty
+                             container with an append method.
+    @return:                 Dictionary of members of the JSON object.
+
+    """
+    return StreamDecoder(chunks, stream_factories).decode()
@@ -0,0 +1,181 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the incremental synchronization of the feeds of users
+with a local store.
+
+"""
+
+import threading
+from datetime import datetime, timedelta
+import settings
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+_feed_getters = {'fitness_activities': 'get_fitness_activity_iter',
+                 'strength_training_activities': 'get_strength_activity_iter',
+                 'weight': 'get_weight_measurement_iter',
+                 'sleep': 'get_sleep_measurement_iter',}
+
+
+class SyncStore(object):
+    """Interface of the local stores used by SyncEngine.
+
+    Feed items are stored as decoded JSON data, keyed by user, feed and item
+    URI.
+
+    """
+
+    def get_checkpoint(self, user_id, feed):
+        """Return the time of the last completed synchronization of feed.
+
+        @param user_id: User ID.
+        @param feed:    Feed name (e.g. fitness_activities).
+        @return:        datetime object or None if the feed was never
+                        synchronized.
+
+        """
+        raise NotImplementedError
+
+    def commit(self, user_id, feed, items, checkpoint, replace=False):
+        """Insert or replace the items of feed and advance the checkpoint of
+        the feed. Either all changes are applied or none.
+
+        @param user_id:    User ID.
+        @param feed:       Feed name (e.g. fitness_activities).
+        @param items:      List of decoded JSON data of feed items.
+        @param checkpoint: Time of the start of the synchronization.
+        @param replace:    Remove the stored items of feed that are not in
+                           items if True.
+
+        """
+        raise NotImplementedError
+
+    def get_items(self, user_id, feed):
+        """Return the decoded JSON data of the stored items of feed.
+
+        @param user_id: User ID.
+        @param feed:    Feed name (e.g. fitness_activities).
+        @return:        List of dictionaries.
+
+        """
+        raise NotImplementedError
+
+
+class MemoryStore(SyncStore):
+    """SyncStore keeping the items in memory."""
+
+    def __init__(self):
+        self._checkpoints = {}
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get_checkpoint(self, user_id, feed):
+        with self._lock:
+            return self._checkpoints.get((user_id, feed))
+
+    def commit(self, user_id, feed, items, checkpoint, replace=False):
+        updates = dict((item['uri'], item) for item in items)
+        with self._lock:
+            if replace:
+                self._items[(user_id, feed)] = updates
+            else:
+                self._items.setdefault((user_id, feed), {}).update(updates)
+            self._checkpoints[(user_id, feed)] = checkpoint
+
+    def get_items(self, user_id, feed):
+        with self._lock:
+            return self._items.get((user_id, feed), {}).values()
+
+
+class SyncEngine(object):
+    """Incremental synchronization of the feeds of users with a SyncStore.
+
+    The first synchronization of a feed retrieves all items. Later ones only
+    retrieve the items modified since the checkpoint of the previous
+    synchronization, using the modifiedNoEarlierThan parameter of the feed.
+    The API filters modification times by date; the requested range starts
+    settings.SYNC_OVERLAP_DAYS days before the checkpoint date to cover the
+    time zone difference with the server, so items may be retrieved more than
+    once.
+
+    Incremental synchronizations only insert and update items; items deleted
+    on the server are kept in the store. A full synchronization retrieves all
+    items and replaces the stored items of the feed.
+
+    """
+
+    def __init__(self, store, feeds=settings.SYNC_FEEDS, page_size=None,
+                 workers=None):
+        """Initialize synchronization engine.
+
+        @param store:     SyncStore object.
+        @param feeds:     Names of the feeds of User resources to synchronize.
+        @param page_size: Number of items retrieved per request.
+        @param workers:   Number of threads for retrieving the pages of feeds
+                          concurrently. Pages are retrieved one by one if None.
+
+        """
+        self._store = store
+        self._feeds = feeds
+        self._page_size = page_size
+        self._workers = workers
+
+    @property
+    def store(self):
+        return self._store
+
+    def sync(self, user, full=False):
+        """Synchronize the feeds of user.
+
+        @param user: User object.
+        @param full: Retrieve all items and remove the stored items deleted
+                     on the server if True.
+        @return:     Dictionary of the number of items retrieved per feed.
+
+        """
+        return dict((feed, self.sync_feed(user, feed, full)) 
+                    for feed in self._feeds)
+
+    def sync_feed(self, user, feed, full=False):
+        """Synchronize a feed of user. The checkpoint is only advanced after
+        all items modified since the previous checkpoint were retrieved.
+
+        @param user: User object.
+        @param feed: Feed name (e.g. fitness_activities).
+        @param full: Retrieve all items and replace the stored items of the
+                     feed, removing the items deleted on the server, if True.
+        @return:     Number of items retrieved.
+
+        """
+        user_id = user['userID']
+        started = datetime.now()
+        checkpoint = None
+        if not full:
+            checkpoint = self._store.get_checkpoint(user_id, feed)
+        if checkpoint is not None:
+            mod_date_min = (checkpoint
+                            - timedelta(days=settings.SYNC_OVERLAP_DAYS)).date()
+        else:
+            mod_date_min = None
+        getter = getattr(user, _feed_getters[feed])
+        feed_iter = getter(mod_date_min=mod_date_min, page_size=self._page_size,
+                           workers=self._workers)
+        if feed_iter is None:
+            if full:
+                self._store.commit(user_id, feed, [], started, replace=True)
+            return 0
+        items = list(feed_iter.iter_data())
+        self._store.commit(user_id, feed, items, started, 
+                           replace=checkpoint is None)
+        return len(items)
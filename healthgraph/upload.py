@@ -0,0 +1,305 @@
+"""Python Client Library for Health Graph API (http://developer.runkeeper.com/healthgraph).
+
+The API is used for accessing RunKeeper (http://runkeeper.com) for retrieving,
+updating, deleting and uploading Fitness Activity and Health Measurements Information.
+
+This module implements the concurrent bulk upload of new activities and
+measurements.
+
+"""
+
+import time
+import json
+import hashlib
+import threading
+from collections import namedtuple
+from datetime import date
+import requests
+import settings
+import exceptions
+import sessionmgr
+from concurrency import ordered_map
+from ratelimit import RetryPolicy
+from parser import format_datetime
+
+
+__author__ = "Ali Onur Uyar"
+__copyright__ = "Copyright 2012, Ali Onur Uyar"
+__credits__ = []
+__license__ = "GPL"
+__version__ = "0.3.0"
+__email__ = "aouyar at gmail.com"
+__status__ = "Development"
+
+
+CREATED = 'created'
+SKIPPED = 'skipped'
+FAILED = 'failed'
+
+
+class UploadResult(namedtuple('UploadResult',
+                              ('key', 'item', 'status', 'uri', 'error'))):
+    """Result of the upload of an item.
+
+    key:    Upload key of item.
+    item:   Item as passed to the uploader.
+    status: CREATED, SKIPPED (uploaded before according to the upload log, or
+            a duplicate of an item being uploaded) or FAILED.
+    uri:    Resource URI of the created resource, if known.
+    error:  Error message for failed uploads.
+
+    """
+
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.status != FAILED
+
+
+class UploadLog(object):
+    """Interface of the logs of completed uploads used by BulkUploader for
+    skipping items which were uploaded before.
+
+    Before posting an item, the uploader reserves its key; the reservation
+    is completed by mark_uploaded or cancelled by release. Reserving must be
+    atomic, so that concurrent uploads of the same item post it only once.
+
+    """
+
+    def reserve(self, key):
+        """Reserve key for an upload unless an item was uploaded with key or
+        the key is reserved already.
+
+        @param key: Upload key.
+        @return:    True if the key was reserved by the call.
+
+        """
+        raise NotImplementedError
+
+    def release(self, key):
+        """Cancel the reservation of key following a failed upload.
+
+        @param key: Upload key.
+
+        """
+        raise NotImplementedError
+
+    def get_uploaded(self, key):
+        """Return the resource URI of the item uploaded with key.
+
+        @param key: Upload key.
+        @return:    Resource URI, an empty string if the URI is not known, or
+                    None if no item was uploaded with key.
+
+        """
+        raise NotImplementedError
+
+    def mark_uploaded(self, key, uri):
+        """Record the upload of an item, completing the reservation of key.
+
+        @param key: Upload key.
+        @param uri: Resource URI of the created resource or None.
+
+        """
+        raise NotImplementedError
+
+
+class MemoryUploadLog(UploadLog):
+    """UploadLog keeping the keys in memory."""
+
+    def __init__(self):
+        self._uploaded = {}
+        self._reserved = set()
+        self._lock = threading.Lock()
+
+    def reserve(self, key):
+        with self._lock:
+            if key in self._uploaded or key in self._reserved:
+                return False
+            self._reserved.add(key)
+            return True
+
+    def release(self, key):
+        with self._lock:
+            self._reserved.discard(key)
+
+    def get_uploaded(self, key):
+        with self._lock:
+            return self._uploaded.get(key)
+
+    def mark_uploaded(self, key, uri):
+        with self._lock:
+            self._reserved.discard(key)
+            self._uploaded[key] = uri or ''
+
+    def __len__(self):
+        return len(self._uploaded)
+
+
+def _encode_value(val):
+    if isinstance(val, date):
+        return format_datetime(val)
+    raise TypeError("%r is not JSON serializable" % (val,))
+
+def encode_item(item):
+    """Return JSON body for a new activity or measurement. Dates and datetimes
+    are formatted as expected by the API.
+
+    """
+    return json.dumps(item, default=_encode_value, sort_keys=True)
+
+def _key_text(val):
+    if isinstance(val, unicode):
+        return val
+    elif isinstance(val, str):
+        return val.decode('utf-8')
+    return unicode(val)
+
+def _resource_path(uri):
+    if uri and uri.startswith(settings.API_URL):
+        return uri[len(settings.API_URL):]
+    return uri
+
+
+class BulkUploader(object):
+    """Uploader posting new activities or measurements concurrently.
+
+    Items are read from the input iterable as requests complete, so that no
+    more than window requests are in flight or waiting to be returned, and
+    results are returned in the order of the items. Failed uploads are
+    reported in the results instead of raising exceptions.
+
+    Uploads are made idempotent across runs by an upload log: items whose key
+    is recorded in the log, or reserved by an upload in progress, are skipped,
+    so a partially failed upload can be repeated with the same items and log
+    and duplicate items are posted once. By default the key is a hash of the
+    scope, the resource, the content type and the encoded item.
+
+    """
+
+    def __init__(self, session=None, workers=settings.DEFAULT_WORKERS,
+                 window=None, log=None, key_func=None, retries=0):
+        """Initialize uploader.
+
+        @param session:  Session object. The default session is used if None.
+        @param workers:  Number of threads posting items; at least 1. Workers
+                         beyond the connections kept by the transport of the
+                         session (settings.DEFAULT_POOL_MAXSIZE for the 
+                         shared transport) open short lived connections.
+        @param window:   Maximum number of items in flight or waiting to be
+                         returned; at least 1. (Default: Twice the number of
+                         workers.)
+        @param log:      UploadLog object (e.g. MemoryUploadLog or
+                         SQLiteStore). Items are not skipped if None.
+        @param key_func: Function returning the upload key of an item, e.g.
+                         the ID of the record on the device. The key is 
+                         combined with the scope and the resource of the 
+                         upload.
+        @param retries:  Number of times an item is posted again after a
+                         connection error or a server error. Throttled
+                         requests (429) are retried by the session. Retrying
+                         may create duplicates if the server processed the
+                         failed request. The delay before a retry follows
+                         the backoff of the default RetryPolicy.
+
+        """
+        if workers < 1:
+            raise exceptions.ClientError("Number of workers must be at least 1.")
+        if window is None:
+            window = 2 * workers
+        elif window < 1:
+            raise exceptions.ClientError("Window must be at least 1.")
+        if session is not None:
+            self._session = session
+        else:
+            self._session = sessionmgr.get_session()
+        self._workers = workers
+        self._window = window
+        self._log = log
+        self._key_func = key_func
+        self._retries = retries
+        self._retry_policy = RetryPolicy()
+        self._counts = {CREATED: 0, SKIPPED: 0, FAILED: 0,}
+        self._lock = threading.Lock()
+
+    def upload(self, resource, content_type, items, scope=None):
+        """Return iterator posting items and returning the UploadResult of
+        each item in order. The upload progresses as results are consumed.
+
+        @param resource:     Resource URI of feed (e.g. /fitnessActivities).
+        @param content_type: Content type of new items (content_types module).
+        @param items:        Iterable of dictionaries.
+        @param scope:        String included in the default upload keys (e.g.
+                             the user ID), for logs shared by users.
+        @return:             Iterator of UploadResult objects.
+
+        """
+        def upload_item(item):
+            return self._upload_item(resource, content_type, item, scope)
+        return ordered_map(upload_item, items, self._workers, self._window)
+
+    def upload_all(self, resource, content_type, items, scope=None):
+        """Post items and return the list of the UploadResult objects."""
+        return list(self.upload(resource, content_type, items, scope))
+
+    def stats(self):
+        """Return number of created, skipped and failed items."""
+        with self._lock:
+            return dict(self._counts)
+
+    def _get_key(self, resource, content_type, item, body, scope):
+        if self._key_func is not None:
+            return u":".join(_key_text(part) for part in 
+                             (scope or '', resource, self._key_func(item)))
+        text = u"\n".join(_key_text(part) for part in 
+                          (scope or '', resource, content_type, body))
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _upload_item(self, resource, content_type, item, scope):
+        try:
+            body = encode_item(item)
+        except (TypeError, ValueError), e:
+            return self._result(None, item, FAILED, None,
+                                "Error encoding item: %s" % e)
+        try:
+            key = self._get_key(resource, content_type, item, body, scope)
+        except Exception, e:
+            return self._result(None, item, FAILED, None,
+                                "Error computing upload key: %s" % e)
+        if self._log is not None and not self._log.reserve(key):
+            uri = self._log.get_uploaded(key)
+            return self._result(key, item, SKIPPED, uri or None, None)
+        result = None
+        try:
+            result = self._post_item(resource, content_type, item, body, key)
+        finally:
+            if self._log is not None and (result is None or not result.ok):
+                self._log.release(key)
+        return result
+
+    def _post_item(self, resource, content_type, item, body, key):
+        attempt = 0
+        while True:
+            try:
+                resp = self._session.post(resource, content_type, body)
+            except (requests.RequestException, exceptions.Error), e:
+                error = str(e)
+                retry = True
+            else:
+                if resp.status_code < 400:
+                    uri = _resource_path(resp.headers.get('Location'))
+                    if self._log is not None:
+                        self._log.mark_uploaded(key, uri)
+                    return self._result(key, item, CREATED, uri, None)
+                error = "HTTP status %d %s" % (resp.status_code, resp.reason)
+                retry = resp.status_code >= 500
+            if not retry or attempt >= self._retries:
+                return self._result(key, item, FAILED, None, error)
+            time.sleep(self._retry_policy.get_delay(attempt))
+            attempt += 1
+
+    def _result(self, key, item, status, uri, error):
+        with self._lock:
+            self._counts[status] += 1
+        return UploadResult(key, item, status, uri, error)
@@ -86,8 +86,8 @@ def welcome():
         user = healthgraph.User(session=healthgraph.Session(access_token))
         profile = user.get_profile()
         records = user.get_records()
-        act_iter = user.get_fitness_activity_iter()
-        activities = [act_iter.next() for _ in range(5)]
+        act_iter = user.get_fitness_activity_iter(limit=5)
+        activities = list(act_iter)
         return bottle.template('welcome.html', 
                                profile=profile,
                                activities=activities, 